@@ -166,6 +166,10 @@ class ConnectionHandler:
         task_id = id(gevent.getcurrent())
         self.logger.info('%s(%s): connected' % (self.task_name, task_id))
 
+        # Every message is written with a single sendall, so there is nothing for
+        # Nagle's algorithm to coalesce; it would only delay small messages.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
         reader, writer, peer = self.create_connection_instances(sock, address)
 
         if not isinstance(peer, Peer) or \
@@ -21,6 +21,7 @@
 from common.game_items import GamePurchase, GameClass, UnlockableGameClass, \
     UnlockableClassSpecificItem, UnlockableWeapon, UnlockableVoice
 from typing import Set, Iterable
+import io
 import struct
 from ipaddress import IPv4Address
 
@@ -3279,6 +3280,23 @@ class originalfragment():
         stream.write(_originalbytes(self.fromoffset, self.tooffset))
 
 
+class preserialized():
+    ''' A message (or list of messages) that is serialized only once, so that
+        it can be sent to many players without serializing it for each of them.
+        Later changes to the original message are not seen by the copy. '''
+    def __init__(self, message):
+        stream = io.BytesIO()
+        if isinstance(message, list):
+            for el in message:
+                el.write(stream)
+        else:
+            message.write(stream)
+        self.data = stream.getvalue()
+
+    def write(self, stream):
+        stream.write(self.data)
+
+
 def construct_top_level_enumfield(stream):
     ident = struct.unpack('<H', stream.peek(2))[0]
     classname = ('a%04X' % ident).lower()
@@ -18,787 +18,207 @@
 # along with taserver.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from bitarray import bitarray
+from bitarray import bitarray, frozenbitarray
+from collections import defaultdict
+import functools
 from itertools import zip_longest
 import string
 import struct
+import sys
+from types import MappingProxyType
 
 class ParseError(Exception):
-    def __init__(self, message, bitsleft):
+    def __init__(self, message, reader):
         super().__init__(message)
-        self.bitsleft = bitsleft
+        # Only remember where parsing stopped, the bits that were left are
+        # sliced out of the packet if someone asks for them
+        self.bits = reader.bits
+        self.pos = reader.pos
+        self.end = reader.end
 
-class ParserState():
-    def __init__(self):
-        # ID sizes are per-class (probably depends on how many members a class has)
-        # - it is guaranteed to be 8 for the FirstServerObject_0
-        # - it is guaranteed to be 8 for the TrPlayerController_0
-        # - it is guaranteed to be 6 for the TrPlayerReplicationInfo_0
-        # - it appears to be 6 for TrGameReplicationInfo_0
-        # - it appears to be 7 for TrPlayerPawn_0
-
-        TrInventoryManagerProps = {
-            '01111': {'name': 'Instigator',
-                       'type': bitarray,
-                       'size': 10},
-            '11111': {'name': 'Owner',
-                       'type': bitarray,
-                       'size': 10},
-            '10101': {'name': 'InventoryChain',
-                       'type': bitarray,
-                       'size': 11},
-        }
-
-        TrPlayerPawnProps = {
-            '1010000': {'name': 'bNetOwner',
-                        'type': bool},
-            '1101000': {'name': 'RemoteRole',
-                        'type': bitarray,
-                        'size': 2},
-            '1111000': {'name': 'Owner',
-                        'type': bitarray,
-                        'size': 11},
-            '1100100': {'name': 'Rotation',
-                        'type': bitarray,
-                        'size': 11},
-            '1001100': {'name': 'InvManager',
-                        'type': bitarray,
-                        'size': 11},
-            '0111100': {'name': 'PlayerReplicationInfo',
-                        'type': bitarray,
-                        'size': 11},
-            '1111100': {'name': 'HealthMax',
-                        'type': int},
-            '0000010': {'name': 'Health',
-                        'type': int},
-            '1000010': {'name': 'AirControl',
-                        'type': int},
-            '0110010': {'name': 'GroundSpeed',
-                        'type': int},
-            '1101010': {'name': 'bCanSwatTurn',
-                        'type': bool},
-            '0011010': {'name': 'bSimulateGravity',
-                        'type': bool},
-            '1111010': {'name': 'Controller',
-                        'type': bitarray,
-                        'size': 11},
-            # size varies:
-            # 10101000000
-            # 000
-            '1000110': {'name': 'CompressedBodyMatColor',
-                        'type': bitarray,
-                        'size': 3},
-            '0100110': {'name': 'ClientBodyMatDuration',
-                        'type': int},
-            '0101110': {'name': 'LastTakeHitInfo',
-                        'type': bitarray,
-                        'size': 139},
-            '1001001': {'name': 'CurrentWeaponAttachmentClass',
-                        'type': int},
-            '1100101': {'name': 'r_fPowerPoolRechargeRate',
-                        'type': int},
-            '0010101': {'name': 'r_fMaxPowerPool',
-                        'type': int},
-            '1010101': {'name': 'r_fCurrentPowerPool',
-                        'type': int},
-            '1000011': {'name': 'r_bDetectedByEnemyScanner',
-                        'type': bool},
-            '1100011': {'name': 'r_bIsInvulnerable',
-                        'type': bitarray,
-                        'size': 1},
-            '1110011': {'name': 'r_bIsSkiing',
-                        'type': bitarray,
-                        'size': 1},
-            '0111011': {'name': 'RPC ClientUpdateHUDHealth',
-                        'type': [
-                            {'name': 'NewHealth',
-                             'type': int},
-                            {'name': 'NewHealthMax',
-                             'type': int}
-                        ]},
-            '1111011': {'name': 'RPC PlayHardLandingEffect',
-                        'type': bitarray,
-                        'size': 53},
-            '1100111': {'name': 'r_nFlashReloadSecondaryWeapon',
-                        'type': bitarray,
-                        'size': 8}
-        }
-
-        TrDeviceProps = {
-            '100001' : { 'name' : 'r_AmmoCount',
-                         'type' : bitarray,
-                         'size' : 64 },
-            '010001' : { 'name' : 'r_bIsReloading',
-                         'type' : bool },
-            '110001' : { 'name' : 'r_bReadyToFire',
-                         'type' : bool },
-            '001001' : { 'name' : 'r_eEquipAt',
-                         'type' : bitarray,
-                         'size' : 4 },
-            '111101' : { 'name' : 'Owner',
-                         'type' : bitarray,
-                         'size' : 10 },
-            '101011' : { 'name' : 'InvManager',
-                         'type' : bitarray,
-                         'size' : 10 },
-            '011011' : { 'name' : 'Inventory',
-                         'type' : bitarray,
-                         'size' : 10 },
-        }
-
-        TrRadarStationProps = {
-            '000111': {'name': 'r_bReset',
-                       'type': bitarray,
-                       'size': 7},
-            '010111': {'name': 'r_ShieldHealth',
-                       'type': bitarray,
-                       'size': 31}
-        }
-
-        TrInventoryStationProps = {
-            '000111': {'name': 'r_bReset',
-                       'type': bitarray,
-                       'size': 7},
-        }
-
-        TrRepairStationProps = {
-            '000111': {'name': 'r_bReset',
-                       'type': bitarray,
-                       'size': 7},
-        }
-
-        # unsure
-        TrInventoryStationCollisionProps = {
-            # '101100' : { 'name' : 'RelativeLocation2',
-            #              'type' : bitarray,
-            #              'size' : 2 },
-            # '001001' : { 'name' : 'RelativeLocation',
-            #              'type' : bitarray,
-            #              'size' : 10 },
-            # '011111' : { 'name': 'Base',
-            #              'type': bitarray,
-            #              'size': 30},
-        }
-        TrPowerGeneratorProps = {
-            '111110' : { 'name' : 'r_MaxHealth',
-                         'type' : bitarray,
-                         'size' : 31 }
-        }
-
-        # TODO: It looks like RPC identifiers are only 6 bits when sent along with properties.
-        # When sent along with a counter, we need more bits to distinguish between them.
-        TrPlayerControllerProps = {
-            '01000000': {'name': 'bCollideWorld',
-                         'type': bitarray,
-                         'size': 2},
-            '11000000': {'name': 'RPC ClientMatchOver',
-                         'type': [
-                             {'name': 'unknown',
-                              'type': 'flag'},
-                             {'name': 'Winner',
-                              'type': int},
-                             {'name': 'WinnerName',
-                              'type': str}
-                         ]},
-            '00100000': {'name': '!!!!!!!!!INTERESTING Unknown INTERESTING!!!!!!!!!',
-                         'type': bitarray,
-                         'size': 10},
-            '00110000': {'name': 'RPC ClientSetLastDamagerInfo',
-                         'type': bitarray,
-                         'size': 35},
-            # '10001000': {'name': 'RPC ClientPlayerResettingAndRespawning',
-            #            'type': bitarray,
-            #            'size': 1},
-            '10101000': {'name': 'PlayerReplicationInfo',
-                         'type': bitarray,
-                         'size': 11},
-            '01100000': {'name': 'RPC UpdateMatchCountdown',
-                         'type': [
-                             {'name': 'unknown',
-                              'type': 'flag'},
-                             {'name': 'Seconds',
-                              'type': int}
-                         ]},
-            '01101000': {'name': 'Pawn',
-                         'type': bitarray,
-                         'size': 11},
-            '00011000': {'name': 'RPC ClientSetRotation',
-                         'type': bitarray,
-                         'size': 2},
-            '01011000': {'name': 'RPC ClientSwitchToBestWeapon',
-                         'type': bitarray,
-                         'size': 1},
-            # # variable length, so currently it screws up what follows
-            '00100100': {'name': 'RPC ClientGotoState',
-                         'type': [
-                             {'name': 'NewState',
-                              'type': bitarray,
-                              'size': 11},
-                             {'name': 'NewLabel',
-                              'type': bitarray,
-                              'size': 11}
-                         ]},
-            '01100100': {'name': 'RPC GivePawn',
-                         'type': [
-                             {'name': 'NewPawn',
-                              'type': bitarray,
-                              'size': 11}
-                         ]},
-            # the size of this one varies... these appear to be valid:
-            # 1 01100110010011100000000000000000 1 11000000000000000000000000000000 1 11110000000 0 1 10101000000
-            # 1 01101100100010010100000000000000 1 10000000000000000000000000000000 0 1 11110000000 1 01000111110001010100000000000000
-            # 1 01111111000010110100000000000000 1 00000000100000000000000000000000 1 11110000000 0 0
-            # 1 01111111000010110100000000000000 1 10100000000000000000000000000000 0 0 0
-            # 1 00000000011111101100000000000000 1 11100000000000000000000000000000 0 0 0
-            '10010100': {'name': 'RPC ReceiveLocalizedMessage',
-                         'type': [
-                             {'name': 'Message',
-                              'type': int},
-                             {'name': 'Switch',
-                              'type': int},
-                             {'name': 'RelatedPRI_1',
-                              'type': bitarray,
-                              'size': 11},
-                             {'name': 'RelatedPRI_2',
-                              'type': int},
-                             {'name': 'OptionalObject',
-                              'type': bitarray,
-                              'size': 11},
-                         ]},
-            # '11010100': {'name': 'RPC ClientHearSound',
-            #            'type': bitarray,
-            #            'size': 48},
-            '11011100': {'name': 'RPC VeryShortClientAdjustPosition',
-                         'type': [
-                             {'name': 'TimeStamp',
-                              'type': float},
-                             {'name': 'NewLocX',
-                              'type': float},
-                             {'name': 'NewLocY',
-                              'type': float},
-                             {'name': 'NewLocZ',
-                              'type': float},
-                             {'name': 'newBase',
-                              'type': bitarray,
-                              'size': 32}
-                         ]},
-            '00111100': {'name': 'RPC ShortClientAdjustPosition',
-                         'type': [
-                             {'name': 'TimeStamp',
-                              'type': float},
-                             {'name': 'newState',
-                              'type': bitarray,
-                              'size': 11},
-                             {'name': 'newPhysics',
-                              'type': bitarray,
-                              'size': 4},
-                             {'name': 'NewLocX',
-                              'type': float},
-                             {'name': 'NewLocY',
-                              'type': float},
-                             {'name': 'NewLocZ',
-                              'type': float},
-                             {'name': 'newBase',
-                              'type': bitarray,
-                              'size': 32}
-                         ]},
-            '01111100': {'name': 'RPC ClientAckGoodMove',
-                         'type': [
-                             {'name': 'TimeStamp',
-                              'type': float}
-                         ]},
-            '11111100': {'name': 'RPC ClientAdjustPosition',
-                         'type': [
-                             {'name': 'TimeStamp',
-                              'type': float},
-                             {'name': 'newState',
-                              'type': bitarray,
-                              'size': 11},
-                             {'name': 'newPhysics',
-                              'type': bitarray,
-                              'size': 4},
-                             {'name': 'NewLocX',
-                              'type': float},
-                             {'name': 'NewLocY',
-                              'type': float},
-                             {'name': 'NewLocZ',
-                              'type': float},
-                             {'name': 'NewVelX',
-                              'type': float},
-                             {'name': 'NewVelY',
-                              'type': float},
-                             {'name': 'NewVelZ',
-                              'type': float},
-                             {'name': 'newBase',
-                              'type': bitarray,
-                              'size': 32}
-                         ]},
-
-            # reliable client function ClientGameEnded(optional Actor EndGameFocus, optional bool bIsWinner)
-            '00110010': {'name': 'RPC ClientGameEnded',
-                         'type': bitarray,
-                         'size': 2},
-#                         'type': [
-#                             {'name': 'param1',
-#                              'type': bool},
-#                             {'name': 'param2',
-#                              'type': bool}
-#                          ]},
-            # 110101110000 100000000000000000000000000000000100000000000000000000000000000000100
-            # 110100000000 100000000000000000000000000000000100000000000000000000000000000000100
-            # 100001010000 101011110000000000000 100000000000000000000000000000000100000000000000000000000000000000100
-            '10110010': {'name': 'RPC ClientSetViewTarget',
-                         # 'type': [
-                         #     {'name': 'PlayerReplicationInfo',
-                         #      'type': bitarray,
-                         #      'size': 11},
-                         #     {'name':
-                         'type': bitarray,
-                         'size': 81},
-            '11101010': {'name': 'RPC ClientPlayForceFeedbackWaveform',
-                         'type': [
-                             {'name': 'FFWaveform',
-                              'type': int},
-                             {'name': 'FFWaveformInstigator',
-                              'type': None}
-                         ]},
-            # '00111010': {'name': 'bNetOwner',
-            #            'type': bitarray,
-            #            'size': 2},
-            '10110110': {'name': 'RPC ClientWriteLeaderboardStats',
-                         'type': [
-                             {'name': 'OnlineStatsWriteClass',
-                              'type': None}
-                         ]},
-            '11101110': {'name': 'RPC ClientEndOnlineGame',
-                         'type': 'flag'},
-            # '01110001': {'name': 'Rotation',
-            #              'type': bitarray,
-            #              'size': 12},
-            '01001001': {'name': 'RPC PlayStartupMessage',
-                         'type': [
-                             {'name': 'StartupStage',
-                              'type': bitarray,
-                              'size': 8}
-                         ]},
-            # varies in size:
-            # 11110100000011001111001101000110101011111101100000110001010100000000000000
-            # 0101111110101011001010001010100000000000000
-            '11001001': {'name': 'RPC ClientPlayTakeHit',
-                         'type': bitarray,
-                         'size': 43},
-            # '00101001': {'name': 'RPC ClientSetBehindView',
-            #              'type': bitarray,
-            #              'size': 1},
-            # '11011001': {'name': 'RPC ClientPawnDied',
-            #              'type': 'flag'},
-            # '00011101': {'name': 'RemoteRole',
-            #              'type': bitarray,
-            #              'size': 3},
-            '00101011': {'name': 'RPC ClientEndTeamSelect',
-                         'type': [
-                             {'name': 'RequestedTeamNum',
-                              'type': int}
-                         ]},
-            '10111101': {'name': 'r_nCurrentCredits',
-                         'type': bitarray,
-                         'size': 32},
-            '01000011': {'name': 'r_bNeedLoadout',
-                         'type': bool},
-            '11000011': {'name': 'r_bNeedTeam',
-                         'type': bool},
-            '11100011': {'name': 'RPC ClientSeekingMissileTargetingSelfEvent',
-                         'type': [
-                             {'name': 'EventSwitch',
-                              'type': int}
-                         ]},
-        }
-
-        TrBaseTurretProps = {
-            '010001': {'name': 'r_TargetPawn',
-                       'type': bitarray,
-                       'size': 11},
-            '110001': {'name': 'r_FlashCount',
-                       'type': bitarray,
-                       'size': 8},
-            '000111': {'name': 'r_bReset',
-                       'type': bitarray,
-                       'size': 7},
-            '010111': {'name': 'r_ShieldHealth',
-                       'type': bitarray,
-                       'size': 31}
-        }
-
-        TrProj_BaseTurretProps = {
-            '011100' : { 'name' : 'Rotation',
-                         'type' : bitarray,
-                         'size' : 18 },
-            '000001' : { 'name' : 'Velocity',
-                         'type' : bitarray,
-                         'size' : 42 }
-        }
-
-        TrProj_SpinfusorProps = {
-            '10000': {'name': 'bCollideActors',
-                      'type': bool},
-            #'10000': {'name': 'bNetOwner',
-            #          'type': bool},
-            '11100': {'name': 'bTearOff',
-                      'type': bool},
-            '10110': {'name': 'Base',
-                      'type': bitarray,
-                      'size': 31},
-            '10011': {'name': 'r_vSpawnLocation',
-                      'type': bitarray,
-                      'size': 52}
-        }
-
-        TrDroppedPickupProps = {
-            '101101' : { 'name' : 'InventoryClass',
-                         'type' : bitarray,
-                         'size' : 31 },
-            '011101' : { 'name' : 'Base',
-                         'type' : bitarray,
-                         'size' : 30 },
-            '110011' : { 'name' : 'Rotation',
-                         'type' : bitarray,
-                         'size' : 10 },
-            '101011' : { 'name' : 'bFadeOut',
-                         'type' : 'flag' }
-        }
-
-        TrGameReplicationInfoProps = {
-            '000000' : { 'name' : 'netflags',
-                         'type' : bitarray,
-                         'size' : 5 },
-            '011000' : { 'name' : 'm_Flags',
-                         'type' : bitarray,
-                         'size' : 20 },
-            '101000' : { 'name' : 'r_ServerConfig',
-                         'type' : bitarray,
-                         'size' : 12 },
-            '111000' : { 'name' : 'FlagReturnTime',
-                         'type' : bitarray,
-                         'size' : 41 },
-            '011010' : { 'name' : 'ServerName', 'type' : str },
-            '111010' : { 'name' : 'TimeLimit', 'type' : int },
-            '000110' : { 'name' : 'GoalScore', 'type' : int },
-            '100110' : { 'name' : 'RemainingMinute', 'type' : int },
-            '010110' : { 'name' : 'ElapsedTime', 'type' : int },
-            '110110' : { 'name' : 'RemainingTime', 'type' : int },
-            '101110' : { 'name' : 'bMatchIsOver', 'type' : bool },
-            '111110' : { 'name' : 'bStopCountDown', 'type' : bool },
-            '000001' : { 'name' : 'GameClass', 'type' : int },
-            '100001' : { 'name' : 'MessageOfTheDay', 'type' : str },
-            '010001' : { 'name' : 'RulesString', 'type': str },
-            '001001' : { 'name' : 'FlagState',
-                         'type' : bitarray,
-                         'size' : 10,
-                         'values' : { '0000000000' : 'Enemy flag on stand',
-                                      '0000000001' : 'Enemy flag taken',
-                                      '0000000011' : 'Enemy flag dropped',
-                                      '1000000000' : 'Own flag on stand',
-                                      '1000000001' : 'Own flag taken',
-                                      '1000000011' : 'Own flag dropped' } },
-            '111001' : { 'name' : 'bAllowKeyboardAndMouse', 'type' : bool },
-            '010101' : { 'name' : 'bWarmupRound', 'type' : bool },
-            '001101' : { 'name' : 'MinNetPlayers', 'type' : int },
-            '101111' : { 'name' : 'r_nBlip',
-                         'type' : bitarray,
-                         'size' : 8 },
-        }
-
-        TrFlagCTFProps = {
-            '10000' : { 'name' : 'bCollideActors', 'type' : bool},
-            '11000' : { 'name' : 'bHardAttach', 'type' : bool},
-            '00010' : { 'name' : 'Physics',
-                         'type' : bitarray,
-                         'size' : 4 },
-            '00001' : { 'name' : 'Location',
-                         'type' : bitarray,
-                         'size' : 52 },
-            '10001' : { 'name' : 'RelativeLocation',
-                         'type' : bitarray,
-                         'size' : 22 },
-            '11001' : { 'name' : 'Rotation',
-                         'type' : bitarray,
-                         'size' : 11 },
-            '00101' : { 'name' : 'Velocity',
-                         'type' : bitarray,
-                         'size' : 40 },
-            '10111' : { 'name' : 'Base',
-                         'type' : bitarray,
-                         'size' : 10 },
-            '01000' : { 'name' : 'bCollideWorld', 'type' : bool},
-            '01101' : { 'name' : 'bHome', 'type' : bool},
-            '01001' : { 'name' : 'RelativeRotation',
-                        'type' : bitarray,
-                        'size' : 27 },
-            '11101' : { 'name' : 'Team',
-                        'type' : bitarray,
-                        'size' : 11 },
-            '00011' : { 'name' : 'HolderPRI',
-                        'type' : bitarray,
-                        'size' : 11 }
-        }
-
-        TrPlayerReplicationInfoProps = {
-            '000000' : { 'name' : 'netflags',
-                         'type' : bitarray,
-                         'size' : 5 },
-            '000010' : { 'name' : 'Location',
-                         'type' : bitarray,
-                         'size' : 51 },
-            '110010' : { 'name' : 'Rotation',
-                         'type' : bitarray,
-                         'size' : 10 },
-            '101010' : { 'name' : 'UniqueId',
-                         'type' : bitarray,
-                         'size' : 64 },
-            '011010' : { 'name' : 'Unknown field',
-                         'type' : int },
-            '110110' : { 'name' : 'bWaitingPlayer', 'type' : bool },
-            '000110' : { 'name' : 'bBot', 'type' : bool },
-            '101110' : { 'name' : 'bIsSpectator', 'type' : bool },
-            '111110' : { 'name' : 'Team (11 bits)',
-                         'type' : bitarray,
-                         'size' : 11,
-                         'values' : { '10001000000' : 'DiamondSword',
-                                      '11110000000' : 'BloodEagle' } },
-            '000001' : { 'name' : 'PlayerID', 'type' : int },
-            '100001' : { 'name' : 'PlayerName', 'type' : str },
-            '110001' : { 'name' : 'Deaths', 'type' : int },
-            '001001' : { 'name' : 'Score', 'type' : int },
-            '011001' : { 'name' : 'CharClassInfo', 'type' : int },
-            '010101' : { 'name' : 'bHasFlag', 'type': bool},
-            '101101' : { 'name' : 'r_bSkinId', 'type': int},
-            '111101' : { 'name' : 'r_EquipLevels',
-                         'type' : bitarray,
-                         'size' : 48},
-            '000011' : { 'name' : 'r_VoiceClass', 'type': int},
-            '001011' : { 'name' : 'm_nPlayerClassId', 'type': int},
-            '101011' : { 'name' : 'm_nCreditsEarned', 'type': int},
-            '000111' : { 'name' : 'm_nPlayerIconIndex', 'type': int},
-            '001111' : { 'name' : 'm_PendingBaseClass', 'type': int},
-            '101111' : { 'name' : 'm_CurrentBaseClass', 'type': int},
-
-        }
-
-        TrServerSettingsInfoProps = {
-#            '000000': {'name': 'fFriendlyFireDamageMultiplier',
-#                       'type': bitarray,
-#                       'size': 31},
-#            ''
-        }
-
-        FirstClientObjectProps = {
-            '000100' : { 'name' : 'prop8',
-                         'type' : bitarray,
-                         'size' : 162 },
-        }
-
-        FirstServerObjectProps = {
-            '10000000': {'name': 'mysteryproperty3',
-                         'type': PropertyValueMystery3},
-            '11000000': {'name': 'mysteryproperty5',
-                         'type': (
-                             {'name': 'unknown',
-                              'type': int},
-                             {'name': 'unknown2',
-                              'type': str}
-                         )},
-            '00100000': {'name': 'mysteryproperty4',
-                         'type': (
-                             {'name': 'unknown',
-                              'type': bitarray,
-                              'size': 88},
-                             {'name': 'server url',
-                              'type': str}
-                         )},
-            '11100000': {'name': 'mysteryproperty1',
-                         'type': PropertyValueMystery1},
-            '11010000': {'name': 'mysteryproperty2',
-                         'type': PropertyValueMystery2},
-            '10111000': {'name': 'interestingproperty',
-                         'type': PropertyValueInteresting}
-        }
-
-        MatineeActorProps = {
-            '00000': {'name': 'netflags',
-                      'type': bitarray,
-                      'size': 6},
-            '11101': {'name': 'Position',
-                      'type': bitarray,
-                      'size': 32},
-            '00011': {'name': 'PlayRate',
-                      'type': int},
-            '11011': {'name': 'bIsPlaying',
-                      'type': bool},
-            '00111': {'name': 'InterpAction',
-                      'type': bitarray,
-                      'size': 32}
-        }
-
-        UTTeamInfoFlags = {
-            '00000': {'name': 'netflags',
-                      'type': bitarray,
-                      'size': 6},
-            '10101': {'name': 'TeamIndex',
-                      'type': int},
-            '00011': {'name': 'TeamFlag',
-                      'type': bitarray,
-                      'size': 11},
-            '10011': {'name': 'HomeBase',
-                      'type': int}
-        }
-
-        WorldInfo2Props = {
-            '00011': {'name': 'TimeDilation',
-                      'type': int},
-            '01101': {'name': 'WorldGravityZ',
-                      'type': int}
-        }
-
-        self.class_dict = {
-            None:                               {'name': 'FirstServerObject', 'props': FirstServerObjectProps},
-            '00001000100000000111111011011000': {'name': 'FirstClientObject', 'props': FirstClientObjectProps},
-            '10001000000000000000000000000000': {'name': 'FirstServerObject', 'props': FirstServerObjectProps},
-            '00101100100100010000000000000000': {'name': 'MatineeActor', 'props': MatineeActorProps},
-            '00011100001100100100000000000000': {'name': 'TrBaseTurret_BloodEagle', 'props': TrBaseTurretProps},
-            '00111100001100100100000000000000': {'name': 'TrBaseTurret_DiamondSword', 'props': TrBaseTurretProps},
-            '01010111000101011110000000000000': {'name': 'TrCTFBase_BloodEagle', 'props': {}},
-            '00110111000101011110000000000000': {'name': 'TrCTFBase_DiamondSword', 'props': {}},
-            '01111000100110010100000000000000': {'name': 'TrDevice_Blink', 'props': TrDeviceProps},
-            '01000011100110010100000000000000': {'name': 'TrDevice_ConcussionGrenade', 'props': TrDeviceProps},
-            '01100101110110010100000000000000': {'name': 'TrDevice_GrenadeLauncher_Light', 'props': TrDeviceProps},
-            '00111001001110010100000000000000': {'name': 'TrDevice_Twinfusor', 'props': TrDeviceProps},
-            '01001000101110010100000000000000': {'name': 'TrDevice_LaserTargeter', 'props': TrDeviceProps},
-            '01101100101110010100000000000000': {'name': 'TrDevice_LightAssaultRifle', 'props': TrDeviceProps},
-            '01111100101110010100000000000000': {'name': 'TrDevice_LightSpinfusor', 'props': TrDeviceProps},
-            '00100111101110010100000000000000': {'name': 'TrDevice_Melee_DS', 'props': TrDeviceProps},
-            '01011001000001010100000000000000': {'name': 'TrDevice_Spinfusor_100X', 'props': TrDeviceProps},
-            '01011000100001010100000000000000': {'name': 'TrDevice_UtilityPack_Soldier', 'props': TrDeviceProps},
-            '01110101110110010100000000000000': {'name': 'TrDevice_GrenadeXL', 'props': TrDeviceProps},
-            '01001011001001010100000000000000': {'name': 'TrDroppedPickup', 'props': TrDroppedPickupProps},
-            '00100100101111010100000000000000': {'name': 'TrFlagCTF_BloodEagle', 'props': TrFlagCTFProps},
-            '00110100101111010100000000000000': {'name': 'TrFlagCTF_DiamondSword', 'props': TrFlagCTFProps},
-            '01110001101110110100000000000000': {'name': 'TrGameReplicationInfo', 'props': TrGameReplicationInfoProps},
-            '01101101010100001100000000000000': {'name': 'TrInventoryManager', 'props': TrInventoryManagerProps},
-            '01010000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0101?', 'props': TrInventoryStationProps},
-            '01000000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0100?', 'props': TrInventoryStationProps},
-            '01100000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0110?', 'props': TrInventoryStationProps},
-            '00100000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0010?', 'props': TrInventoryStationProps},
-            #'00010010100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0001?', 'props': TrInventoryStationProps},
-            '01001000100101011110000000000000': {'name': 'TrInventoryStation_DiamondSword', 'props': TrInventoryStationProps},
-            '01001011110100001100000000000000': {'name': 'TrInventoryStationCollision', 'props': TrInventoryStationCollisionProps},
-            '00110001010000010100000000000000': {'name': 'TrPlayerController', 'props': TrPlayerControllerProps},
-            '00111010100001100100000000000000': {'name': 'TrPlayerPawn', 'props': TrPlayerPawnProps},
-            '00000110101111001100000000000000': {'name': 'TrPlayerReplicationInfo', 'props': TrPlayerReplicationInfoProps},
-            '00111100100101011110000000000000': {'name': 'TrPowerGenerator_BloodEagle', 'props': TrPowerGeneratorProps},
-            '01111100100101011110000000000000': {'name': 'TrPowerGenerator_DiamondSword', 'props': TrPowerGeneratorProps},
-            '01111010010000101100000000000000': {'name': 'TrProj_BaseTurret', 'props': TrProj_BaseTurretProps},
-            '00101010111000101100000000000000': {'name': 'TrProj_Spinfusor_100X', 'props': TrProj_SpinfusorProps},
-            '01110010100010101100000000000000': {'name': 'TrRadarStation_BloodEagle', 'props': TrRadarStationProps},
-            '01001010100010101100000000000000': {'name': 'TrRadarStation_DiamondSword', 'props': TrRadarStationProps},
-            '00000000110010101100000000000000': {'name': 'TrRepairStationCollision', 'props': TrRepairStationProps},
-            '00010011100001101100000000000000': {'name': 'TrServerSettingsInfo', 'props': TrServerSettingsInfoProps},
-            '00000011110100001100000000000000': {'name': 'TrStationCollision', 'props': {}},
-            '00100010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0010?', 'props': TrRepairStationProps},
-            '01010010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0101?', 'props': TrRepairStationProps},
-            '00110010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0011?', 'props': TrRepairStationProps},
-            '01100010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0110?', 'props': TrRepairStationProps},
-            '01011010100101011110000000000000': {'name': 'TrRepairStation_DiamondSword', 'props': TrRepairStationProps},
-            '00100110100101011110000000000000': {'name': 'TrVehicleStation_BloodEagle', 'props': {}},
-            '01100110100101011110000000000000': {'name': 'TrVehicleStation_DiamondSword', 'props': {}},
-            '00100111010010011000000000000000': {'name': 'UTTeamInfo', 'props': UTTeamInfoFlags},
-            '00000101100101011110000000000000': {'name': 'WorldInfo1', 'props': {}},
-            '01010101111001011110000000000000': {'name': 'WorldInfo2', 'props': WorldInfo2Props}
-        }
-
-        self.instance_count = {}
-        self.channels = {}
+    @property
+    def bitsleft(self):
+        return self.bits[self.pos:self.end]
 
+_float32_struct = struct.Struct('<f')
+_uint32_struct = struct.Struct('<I')
 
 def int2bitarray(n, nbits):
     bits = bitarray(endian='little')
-    bits.frombytes(struct.pack('<L', n))
-    return bits[:nbits]
+    bits.frombytes(n.to_bytes(4, 'little'))
+    if nbits != 32:
+        del bits[nbits:]
+    return bits
+
+# Shared results for values that serialize to the same bits every time,
+# frozen so that a caller can't change them for everyone else
+_EMPTY = frozenbitarray()
+_EMPTY_SIZE0 = frozenbitarray(int2bitarray(0, 32))
+_TRUE = frozenbitarray('1')
+_FALSE = frozenbitarray('0')
+
+@functools.lru_cache(maxsize = 4096)
+def _fieldbits(n, nbits):
+    # Header fields such as property IDs and flags take only a few values, so
+    # their bits are shared instead of built again for every serialization
+    return frozenbitarray(int2bitarray(n, nbits))
 
 def toint(bits):
-    zerobytes = bytes( (0,0,0,0) )
-    longbytes = (bits.tobytes() + zerobytes)[0:4]
-    return struct.unpack('<L', longbytes)[0]
+    return int.from_bytes(bits.tobytes()[0:4], 'little')
 
 def float2bitarray(val):
     bits = bitarray(endian='little')
-    bits.frombytes(struct.pack('<f', val))
+    bits.frombytes(_float32_struct.pack(val))
     return bits
 
 def tofloat(bits):
-    return struct.unpack('<f', bits.tobytes())[0]
-
-def getnbits(n, bits):
-    if n > len(bits):
-        raise ParseError('Tried to get more bits (%d) than are available (%d)' %
-                             (n, len(bits)),
-                         bits)
-    
-    return bits[0:n], bits[n:]
-
-def getstring(bits):
-    stringbytes = bits.tobytes()
-    result = []
-    for b in stringbytes:
-        if b != 0:
-            result.append(chr(b))
+    return _float32_struct.unpack(bits.tobytes())[0]
+
+class BitReader():
+    '''Read position in a bitarray that the parser advances as it goes
+
+    Parsing used to pass the remaining bits around as a new bitarray for
+    every field, which copies the whole tail of the packet each time.
+    Instead all parse functions share a reader on the packet bits and only
+    the fields themselves are sliced out. A reader can be limited to an end
+    position so that a payload cannot be parsed beyond its size.
+
+    The (little-endian) packet bits are also kept as bytes, so that fields
+    that are decoded into numbers are read straight from those bytes
+    without creating a bitarray for them.
+    '''
+    __slots__ = ('bits', 'buf', 'pos', 'end')
+
+    def __init__(self, bits, pos = 0, end = None, buf = None):
+        self.bits = bits
+        self.buf = bits.tobytes() if buf is None else buf
+        self.pos = pos
+        self.end = len(bits) if end is None else end
+
+    def remaining(self):
+        return self.end - self.pos
+
+    def tail(self):
+        return self.bits[self.pos:self.end]
+
+    def notenough(self, n):
+        return ParseError('Tried to get more bits (%d) than are available (%d)' %
+                              (n, self.end - self.pos),
+                          self)
+
+    def read(self, n):
+        pos = self.pos
+        if n > self.end - pos:
+            raise self.notenough(n)
+
+        self.pos = pos + n
+        return self.bits[pos:pos + n]
+
+    def readint(self, n):
+        pos = self.pos
+        if n > self.end - pos:
+            raise self.notenough(n)
+
+        self.pos = pos + n
+        # Load the bytes that the field overlaps as one word and shift it out
+        word = int.from_bytes(self.buf[pos >> 3:(pos + n + 7) >> 3], 'little')
+        return (word >> (pos & 7)) & ((1 << n) - 1)
+
+    def readint32(self):
+        pos = self.pos
+        if 32 > self.end - pos:
+            raise self.notenough(32)
+
+        self.pos = pos + 32
+        if pos & 7 == 0:
+            return _uint32_struct.unpack_from(self.buf, pos >> 3)[0]
+        word = int.from_bytes(self.buf[pos >> 3:(pos >> 3) + 5], 'little')
+        return (word >> (pos & 7)) & 0xFFFFFFFF
+
+    def readfloat(self):
+        pos = self.pos
+        if 32 > self.end - pos:
+            raise self.notenough(32)
+
+        self.pos = pos + 32
+        if pos & 7 == 0:
+            return _float32_struct.unpack_from(self.buf, pos >> 3)[0]
+        word = int.from_bytes(self.buf[pos >> 3:(pos >> 3) + 5], 'little')
+        return _float32_struct.unpack(((word >> (pos & 7)) & 0xFFFFFFFF).to_bytes(4, 'little'))[0]
+
+    def subreader(self, n):
+        pos = self.pos
+        if n > self.end - pos:
+            raise self.notenough(n)
+
+        self.pos = pos + n
+        return BitReader(self.bits, pos, pos + n, self.buf)
+
+def getstring(reader, size = None):
+    # If the size of the string including its terminating zero is known, then
+    # look for the zero within that many bytes before taking the whole tail
+    stringlength = -1
+    if size is not None and size * 8 <= reader.remaining():
+        if reader.pos & 7 == 0:
+            # A string that starts on a byte boundary is in the packet bytes as is
+            stringbytes = reader.buf[reader.pos >> 3:(reader.pos >> 3) + size]
         else:
-            break
+            stringbytes = reader.bits[reader.pos:reader.pos + size * 8].tobytes()
+        stringlength = stringbytes.find(0)
 
-    return ''.join(result), bits[(len(result) + 1) * 8:]
+    if stringlength < 0:
+        stringbytes = reader.tail().tobytes()
+        stringlength = stringbytes.find(0)
+        if stringlength < 0:
+            stringlength = len(stringbytes)
+
+    reader.pos = min(reader.pos + (stringlength + 1) * 8, reader.end)
+    return stringbytes[:stringlength].decode('latin1')
 
 def debugbits(func):
+    # The undecorated function stays reachable as wrapper.__wrapped__, so that
+    # compiled parsers can skip the wrapper when they are not debugging
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        # Parsing without debug output goes straight to the parse function
+        if not kwargs['debug']:
+            return func(*args, **kwargs)
+
         self = args[0]
-        bitsbefore = args[1]
-        debug = kwargs['debug']
-
-        if debug:
-            print('%s::frombitarray (entry): starting with %s%s' %
-                  (self.__class__.__name__,
-                   bitsbefore.to01()[0:32],
-                   '...' if len(bitsbefore) > 32 else ' EOF'))
-        bitsafter = func(*args, **kwargs)
-
-        if debug:
-            nbits_consumed = len(bitsbefore) - len(bitsafter)
-            if bitsbefore[nbits_consumed:] != bitsafter:
-                raise RuntimeError('Function not returning a tail of the input bits')
-            print('%s::frombitarray (exit) : consumed \'%s\'' %
-                  (self.__class__.__name__, bitsbefore.to01()[:nbits_consumed]))
-
-            if bitsbefore[:nbits_consumed] != self.tobitarray():
-                raise RuntimeError('Object %s serialized into bits is not equal to bits parsed:\n' % repr(self) +
-                                   'in : %s\n' % bitsbefore[:nbits_consumed].to01() +
-                                   'out: %s\n' % self.tobitarray().to01())
-
-        return bitsafter
-    
+        reader = args[1]
+        startpos = reader.pos
+        print('%s::frombitarray (entry): starting with %s%s' %
+              (self.__class__.__name__,
+               reader.bits[startpos:min(startpos + 32, reader.end)].to01(),
+               '...' if reader.remaining() > 32 else ' EOF'))
+        func(*args, **kwargs)
+
+        consumedbits = reader.bits[startpos:reader.pos]
+        print('%s::frombitarray (exit) : consumed \'%s\'' %
+              (self.__class__.__name__, consumedbits.to01()))
+
+        if consumedbits != self.tobitarray():
+            raise RuntimeError('Object %s serialized into bits is not equal to bits parsed:\n' % repr(self) +
+                               'in : %s\n' % consumedbits.to01() +
+                               'out: %s\n' % self.tobitarray().to01())
+
     return wrapper
 
 
 class PropertyValueMultipleChoice():
+    __slots__ = ('value', 'valuebits')
+
     def __init__(self):
         self.value = None
         self.valuebits = None
 
     @debugbits
-    def frombitarray(self, bits, size, values, debug = False):
-        self.valuebits, bits = getnbits(size, bits)
-        self.value = values.get(self.valuebits.to01(), 'Unknown')
-        return bits
+    def frombitarray(self, reader, size, values, debug = False):
+        self.valuebits = reader.read(size)
+        self.value = values.get(toint(self.valuebits), 'Unknown')
 
     def tobitarray(self):
-        return self.valuebits if self.value is not None else bitarray()
+        return self.valuebits if self.value is not None else _EMPTY
 
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
@@ -811,36 +231,35 @@ class PropertyValueMultipleChoice():
         return text
 
 class PropertyValueString():
+    __slots__ = ('size', 'value')
+
     def __init__(self):
         self.size = None
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        stringsizebits, bits = getnbits(32, bits)
-        self.size = toint(stringsizebits)
+    def frombitarray(self, reader, debug = False):
+        self.size = reader.readint32()
 
         if self.size > 0:
-            self.value, bits = getstring(bits)
+            self.value = getstring(reader, self.size)
 
             if len(self.value) + 1 != self.size:
                 raise ParseError('ERROR: string size (%d) was not equal to expected size (%d)' %
                                      (len(self.value) + 1,
                                       self.size),
-                                 bits)
+                                 reader)
         else:
             self.value = ''
 
-        return bits
-
     def tobitarray(self):
-        if self.value is not None:
-            bits = int2bitarray(self.size, 32)
-            if self.size > 0:
-                bits.frombytes(bytes(self.value, encoding = 'latin1'))
-                bits.extend('00000000')
-        else:
-            bits = bitarray()
+        if self.value is None:
+            return _EMPTY
+        if self.size == 0:
+            return _EMPTY_SIZE0
+        bits = bitarray(endian='little')
+        bits.frombytes(self.size.to_bytes(4, 'little') +
+                       self.value.encode('latin1') + b'\x00')
         return bits
     
     def tostring(self, indent = 0):
@@ -858,28 +277,35 @@ class PropertyValueString():
         return text
 
 class PropertyValueVector():
+    __slots__ = ('short1', 'short2', 'short3')
+
     def __init__(self):
         self.short1 = None
         self.short2 = None
         self.short3 = None
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        valuebits, bits = getnbits(16, bits)
-        self.short1 = toint(valuebits)
-        valuebits, bits = getnbits(16, bits)
-        self.short2 = toint(valuebits)
-        valuebits, bits = getnbits(16, bits)
-        self.short3 = toint(valuebits)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        if reader.remaining() >= 48:
+            # The three shorts are contiguous, so read them as one value
+            value = reader.readint(48)
+            self.short1 = value & 0xFFFF
+            self.short2 = (value >> 16) & 0xFFFF
+            self.short3 = value >> 32
+        else:
+            self.short1 = reader.readint(16)
+            self.short2 = reader.readint(16)
+            self.short3 = reader.readint(16)
 
     def tobitarray(self):
         if self.short3 is not None:
-            return (int2bitarray(self.short1, 16) +
-                    int2bitarray(self.short2, 16) +
-                    int2bitarray(self.short3, 16))
+            bits = bitarray(endian='little')
+            bits.frombytes(self.short1.to_bytes(2, 'little') +
+                           self.short2.to_bytes(2, 'little') +
+                           self.short3.to_bytes(2, 'little'))
+            return bits
         else:
-            return bitarray()
+            return _EMPTY
     
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
@@ -893,17 +319,17 @@ class PropertyValueVector():
             return '%sempty\n' % indent_prefix
 
 class PropertyValueInt():
+    __slots__ = ('value',)
+
     def __init__(self):
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        valuebits, bits = getnbits(32, bits)
-        self.value = toint(valuebits)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.value = reader.readint32()
 
     def tobitarray(self):
-        return int2bitarray(self.value, 32) if self.value is not None else bitarray()
+        return int2bitarray(self.value, 32) if self.value is not None else _EMPTY
     
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
@@ -918,17 +344,17 @@ class PropertyValueInt():
 
 
 class PropertyValueFloat():
+    __slots__ = ('value',)
+
     def __init__(self):
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, debug=False):
-        valuebits, bits = getnbits(32, bits)
-        self.value = tofloat(valuebits)
-        return bits
+    def frombitarray(self, reader, debug=False):
+        self.value = reader.readfloat()
 
     def tobitarray(self):
-        return float2bitarray(self.value) if self.value is not None else bitarray()
+        return float2bitarray(self.value) if self.value is not None else _EMPTY
 
     def tostring(self, indent=0):
         indent_prefix = ' ' * indent
@@ -942,17 +368,19 @@ class PropertyValueFloat():
 
 
 class PropertyValueBool():
+    __slots__ = ('value',)
+
     def __init__(self):
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        valuebits, bits = getnbits(1, bits)
-        self.value = (valuebits[0] == 1)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.value = (reader.readint(1) == 1)
 
     def tobitarray(self):
-        return bitarray([self.value]) if self.value is not None else bitarray()
+        if self.value is None:
+            return _EMPTY
+        return _TRUE if self.value else _FALSE
 
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
@@ -965,15 +393,17 @@ class PropertyValueBool():
         return text
 
 class PropertyValueFlag():
+    __slots__ = ()
+
     def __init__(self):
         pass
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        return bits
+    def frombitarray(self, reader, debug = False):
+        pass
 
     def tobitarray(self):
-        return bitarray()
+        return _EMPTY
 
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
@@ -981,13 +411,14 @@ class PropertyValueFlag():
         return text
         
 class PropertyValueBitarray():
+    __slots__ = ('value',)
+
     def __init__(self):
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, size, debug = False):
-        self.value, bits = getnbits(size, bits)
-        return bits
+    def frombitarray(self, reader, size, debug = False):
+        self.value = reader.read(size)
 
     def tobitarray(self):
         return self.value if self.value is not None else bitarray()
@@ -1000,7 +431,32 @@ class PropertyValueBitarray():
             text = '%sempty\n' % indent_prefix
         return text
 
+class PropertyValueSmallBitarray():
+    __slots__ = ('size', 'value')
+
+    def __init__(self):
+        self.size = None
+        self.value = None
+
+    @debugbits
+    def frombitarray(self, reader, size, debug = False):
+        self.size = size
+        self.value = reader.readint(size)
+
+    def tobitarray(self):
+        return int2bitarray(self.value, self.size) if self.value is not None else bitarray()
+
+    def tostring(self, indent = 0):
+        indent_prefix = ' ' * indent
+        if self.value is not None:
+            text = '%s%s (value)\n' % (indent_prefix, int2bitarray(self.value, self.size).to01())
+        else:
+            text = '%sempty\n' % indent_prefix
+        return text
+
 class PropertyValueMystery1():
+    __slots__ = ('int1', 'int2', 'int3', 'int4', 'string1', 'string2', 'int5', 'int6', 'string3')
+
     def __init__(self):
         self.int1 = PropertyValueInt()
         self.int2 = PropertyValueInt()
@@ -1013,28 +469,30 @@ class PropertyValueMystery1():
         self.string3 = PropertyValueString()
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        bits = self.int1.frombitarray(bits, debug = debug)
-        bits = self.int2.frombitarray(bits, debug = debug)
-        bits = self.int3.frombitarray(bits, debug = debug)
-        bits = self.int4.frombitarray(bits, debug = debug)
-        bits = self.string1.frombitarray(bits, debug = debug)
-        bits = self.string2.frombitarray(bits, debug = debug)
-        bits = self.int5.frombitarray(bits, debug = debug)
-        bits = self.int6.frombitarray(bits, debug = debug)
-        bits = self.string3.frombitarray(bits, debug = debug)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.int1.frombitarray(reader, debug = debug)
+        self.int2.frombitarray(reader, debug = debug)
+        self.int3.frombitarray(reader, debug = debug)
+        self.int4.frombitarray(reader, debug = debug)
+        self.string1.frombitarray(reader, debug = debug)
+        self.string2.frombitarray(reader, debug = debug)
+        self.int5.frombitarray(reader, debug = debug)
+        self.int6.frombitarray(reader, debug = debug)
+        self.string3.frombitarray(reader, debug = debug)
 
     def tobitarray(self):
-        return (self.int1.tobitarray() +
-                self.int2.tobitarray() +
-                self.int3.tobitarray() +
-                self.int4.tobitarray() +
-                self.string1.tobitarray() +
-                self.string2.tobitarray() +
-                self.int5.tobitarray() +
-                self.int6.tobitarray() +
-                self.string3.tobitarray())
+        bits = bitarray(endian = 'little')
+        for value in (self.int1,
+                      self.int2,
+                      self.int3,
+                      self.int4,
+                      self.string1,
+                      self.string2,
+                      self.int5,
+                      self.int6,
+                      self.string3):
+            bits.extend(value.tobitarray())
+        return bits
 
     def tostring(self, indent = 0):
         items = []
@@ -1051,22 +509,26 @@ class PropertyValueMystery1():
         return text
 
 class PropertyValueMystery2():
+    __slots__ = ('string1', 'string2', 'string3')
+
     def __init__(self):
         self.string1 = PropertyValueString()
         self.string2 = PropertyValueString()
         self.string3 = PropertyValueString()
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        bits = self.string1.frombitarray(bits, debug = debug)
-        bits = self.string2.frombitarray(bits, debug = debug)
-        bits = self.string3.frombitarray(bits, debug = debug)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.string1.frombitarray(reader, debug = debug)
+        self.string2.frombitarray(reader, debug = debug)
+        self.string3.frombitarray(reader, debug = debug)
 
     def tobitarray(self):
-        return (self.string1.tobitarray() +
-                self.string2.tobitarray() +
-                self.string3.tobitarray())
+        bits = bitarray(endian = 'little')
+        for value in (self.string1,
+                      self.string2,
+                      self.string3):
+            bits.extend(value.tobitarray())
+        return bits
 
     def tostring(self, indent = 0):
         items = []
@@ -1077,19 +539,23 @@ class PropertyValueMystery2():
         return text
 
 class PropertyValueMystery3():
+    __slots__ = ('string1', 'string2')
+
     def __init__(self):
         self.string1 = PropertyValueString()
         self.string2 = PropertyValueString()
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        bits = self.string1.frombitarray(bits, debug = debug)
-        bits = self.string2.frombitarray(bits, debug = debug)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.string1.frombitarray(reader, debug = debug)
+        self.string2.frombitarray(reader, debug = debug)
 
     def tobitarray(self):
-        return (self.string1.tobitarray() +
-                self.string2.tobitarray())
+        bits = bitarray(endian = 'little')
+        for value in (self.string1,
+                      self.string2):
+            bits.extend(value.tobitarray())
+        return bits
 
     def tostring(self, indent = 0):
         items = []
@@ -1099,22 +565,21 @@ class PropertyValueMystery3():
         return text
 
 class PropertyValueArray:
+    __slots__ = ('length', 'fields')
+
     def __init__(self):
         self.length = None
         self.fields = []
 
     @debugbits
-    def frombitarray(self, bits, debug=False):
-        lengthbits, bits = getnbits(16, bits)
-        self.length = toint(lengthbits)
+    def frombitarray(self, reader, debug=False):
+        self.length = reader.readint(16)
 
         self.fields = []
         for i in range(self.length):
             field = PropertyValueField()
             self.fields.append(field)
-            bits = field.frombitarray(bits, debug=debug)
-
-        return bits
+            field.frombitarray(reader, debug=debug)
 
     def tobitarray(self):
         bits = int2bitarray(self.length, 16)
@@ -1125,10 +590,9 @@ class PropertyValueArray:
     def tostring(self, indent=0):
         indent_prefix = ' ' * indent
         if self.length is not None:
-            text = '%s%s (length = %d)\n' % (indent_prefix, int2bitarray(self.length, 16).to01(), self.length)
-
-            for field in self.fields:
-                text += field.tostring(indent + 4)
+            items = ['%s%s (length = %d)\n' % (indent_prefix, int2bitarray(self.length, 16).to01(), self.length)]
+            items.extend(field.tostring(indent + 4) for field in self.fields)
+            text = ''.join(items)
         else:
             text = '%sempty\n' % indent_prefix
 
@@ -1136,22 +600,21 @@ class PropertyValueArray:
 
 
 class PropertyValueArrayOfArrays:
+    __slots__ = ('length', 'arrays')
+
     def __init__(self):
         self.length = None
         self.arrays = []
 
     @debugbits
-    def frombitarray(self, bits, debug=False):
-        lengthbits, bits = getnbits(16, bits)
-        self.length = toint(lengthbits)
+    def frombitarray(self, reader, debug=False):
+        self.length = reader.readint(16)
 
         self.arrays = []
         for i in range(self.length):
             array = PropertyValueArray()
             self.arrays.append(array)
-            bits = array.frombitarray(bits, debug=debug)
-
-        return bits
+            array.frombitarray(reader, debug=debug)
 
     def tobitarray(self):
         bits = int2bitarray(self.length, 16)
@@ -1162,10 +625,9 @@ class PropertyValueArrayOfArrays:
     def tostring(self, indent=0):
         indent_prefix = ' ' * indent
         if self.length is not None:
-            text = '%s%s (length = %d)\n' % (indent_prefix, int2bitarray(self.length, 16).to01(), self.length)
-
-            for array in self.arrays:
-                text += array.tostring(indent + 4)
+            items = ['%s%s (length = %d)\n' % (indent_prefix, int2bitarray(self.length, 16).to01(), self.length)]
+            items.extend(array.tostring(indent + 4) for array in self.arrays)
+            text = ''.join(items)
         else:
             text = '%sempty\n' % indent_prefix
 
@@ -1174,34 +636,35 @@ class PropertyValueArrayOfArrays:
 
 
 class PropertyValueField:
+    __slots__ = ('ident', 'data')
+
     fieldmap = {
         '0000111010000000': PropertyValueArrayOfArrays,
         '1111011010000000': PropertyValueArrayOfArrays,
         '0011011000100000': 64,
         '1101100100100000': PropertyValueFloat
     }
+    # Field definitions by the integer value of the ident that is read
+    fielddefs = {int(identkey[::-1], 2) : fielddef for identkey, fielddef in fieldmap.items()}
 
     def __init__(self):
         self.ident = None
         self.data = None
 
     @debugbits
-    def frombitarray(self, bits, debug=False):
-        idbits, bits = getnbits(16, bits)
-        self.ident = toint(idbits)
+    def frombitarray(self, reader, debug=False):
+        self.ident = reader.readint(16)
 
-        if idbits.to01() in self.fieldmap:
-            fielddef = self.fieldmap[idbits.to01()]
+        fielddef = self.fielddefs.get(self.ident, None)
+        if fielddef is not None:
             if isinstance(fielddef, int):
-                self.data, bits = getnbits(fielddef, bits)
+                self.data = reader.read(fielddef)
             else:
                 self.data = fielddef()
-                bits = self.data.frombitarray(bits, debug=debug)
+                self.data.frombitarray(reader, debug=debug)
         else:
             self.data = PropertyValueInt()
-            bits = self.data.frombitarray(bits, debug=debug)
-
-        return bits
+            self.data.frombitarray(reader, debug=debug)
 
     def tobitarray(self):
         bits = int2bitarray(self.ident, 16)
@@ -1226,25 +689,24 @@ class PropertyValueField:
 
 
 class PropertyValueInteresting:
+    __slots__ = ('prefixbits', 'length', 'fields')
+
     def __init__(self):
         self.prefixbits = None
         self.length = None
         self.fields = []
 
     @debugbits
-    def frombitarray(self, bits, debug=False):
-        self.prefixbits, bits = getnbits(44, bits)
+    def frombitarray(self, reader, debug=False):
+        self.prefixbits = reader.read(44)
 
-        lengthbits, bits = getnbits(16, bits)
-        self.length = toint(lengthbits)
+        self.length = reader.readint(16)
 
         self.fields = []
         for i in range(self.length):
             field = PropertyValueField()
             self.fields.append(field)
-            bits = field.frombitarray(bits, debug=debug)
-
-        return bits
+            field.frombitarray(reader, debug=debug)
 
     def tobitarray(self):
         bits = self.prefixbits[:]
@@ -1256,71 +718,28 @@ class PropertyValueInteresting:
     def tostring(self, indent=0):
         indent_prefix = ' ' * indent
         if self.prefixbits is not None:
-            text = '%s%s (prefix)\n' % (indent_prefix, self.prefixbits.to01())
-
-            for field in self.fields:
-                text += field.tostring(indent)
+            items = ['%s%s (prefix)\n' % (indent_prefix, self.prefixbits.to01())]
+            items.extend(field.tostring(indent) for field in self.fields)
+            text = ''.join(items)
         else:
             text = '%sempty\n' % indent_prefix
 
         return text
 
 
-def parse_basic_property(propertyname, propertytype, bits, size=None, debug=False):
-    if propertytype is str:
-        value = PropertyValueString()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype is int:
-        value = PropertyValueInt()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype is float:
-        value = PropertyValueFloat()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype is bool:
-        value = PropertyValueBool()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype is 'flag':
-        value = PropertyValueFlag()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype is bitarray:
-        value = PropertyValueBitarray()
-        #if size is None:
-        #    raise RuntimeError("Coding error: size can't be None for bitarray")
-        bits = value.frombitarray(bits, size, debug=debug)
-    elif propertytype == PropertyValueMystery1:
-        value = PropertyValueMystery1()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype == PropertyValueMystery2:
-        value = PropertyValueMystery2()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype == PropertyValueMystery3:
-        value = PropertyValueMystery3()
-        bits = value.frombitarray(bits, debug=debug)
-    elif propertytype == PropertyValueInteresting:
-        value = PropertyValueInteresting()
-        bits = value.frombitarray(bits, debug=debug)
-    else:
-        raise RuntimeError('Coding error: propertytype of property %s has invalid value: %s' % (propertyname, propertytype))
-
-    return value, bits
-
-
 class PropertyValueStruct():
-    def __init__(self, member_list):
+    __slots__ = ('member_list', 'ops', 'values')
+
+    def __init__(self, member_list, ops):
         self.member_list = member_list
+        self.ops = ops
         self.values = []
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
+    def frombitarray(self, reader, debug = False):
         self.values = []
-        for member in self.member_list:
-            propertyname = member.get('name', None)
-            propertytype = member.get('type', None)
-            propertysize = member.get('size', None)
-            value, bits = parse_basic_property(propertyname, propertytype, bits, propertysize, debug = debug)
-            self.values.append(value)
-
-        return bits
+        for parse in self.ops:
+            self.values.append(parse(reader, debug))
 
     def tobitarray(self):
         allbits = bitarray()
@@ -1331,45 +750,42 @@ class PropertyValueStruct():
     def tostring(self, indent = 0):
         items = []
         for member, value in zip(self.member_list, self.values):
-            items.append(value.tostring(indent)[:-1] + '(%s)\n' % member['name'])
+            items.append(value.tostring(indent)[:-1] + '(%s)\n' % member.name)
         text = ''.join(items)
         return text
 
 
 class PropertyValueParams():
-    def __init__(self, param_list):
+    __slots__ = ('param_list', 'ops', 'presence', 'values')
+
+    def __init__(self, param_list, ops):
         self.param_list = param_list
+        self.ops = ops
         self.presence = []
         self.values = []
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
+    def frombitarray(self, reader, debug = False):
 
         self.values = []
-        for member in self.param_list:
-            propertyname = member.get('name', None)
-            propertytype = member.get('type', None)
-            propertysize = member.get('size', None)
-
-            present, bits = getnbits(1, bits)
-            self.presence.append(present[0])
-            if present[0] == 1:
-                value, bits = parse_basic_property(propertyname, propertytype, bits, propertysize, debug = debug)
+        for parse in self.ops:
+            present = reader.readint(1)
+            self.presence.append(present)
+            if present == 1:
+                value = parse(reader, debug)
             else:
                 value = None
             self.values.append(value)
 
-        return bits
-
     def tobitarray(self):
         allbits = bitarray()
         for present, value in zip_longest(self.presence, self.values):
             if present:
-                allbits += bitarray([1])
+                allbits.append(1)
                 if value is not None:
                     allbits += value.tobitarray()
             else:
-                allbits += bitarray([0])
+                allbits.append(0)
         return allbits
 
     def tostring(self, indent = 0):
@@ -1377,63 +793,913 @@ class PropertyValueParams():
         items = []
         for member, present, value in zip_longest(self.param_list, self.presence, self.values):
             if present:
-                items.append('%s1 (%s param present)\n' % (indent_prefix, member['name']))
+                items.append('%s1 (%s param present)\n' % (indent_prefix, member.name))
                 if value is not None:
-                    items.append(value.tostring(indent)[:-1] + '(%s)\n' % member['name'])
+                    items.append(value.tostring(indent)[:-1] + '(%s)\n' % member.name)
             else:
-                items.append('%s0 (%s param absent)\n' % (indent_prefix, member['name']))
+                items.append('%s0 (%s param absent)\n' % (indent_prefix, member.name))
         text = ''.join(items)
         return text
 
 
+# ID sizes are per-class (probably depends on how many members a class has)
+# - it is guaranteed to be 8 for the FirstServerObject_0
+# - it is guaranteed to be 8 for the TrPlayerController_0
+# - it is guaranteed to be 6 for the TrPlayerReplicationInfo_0
+# - it appears to be 6 for TrGameReplicationInfo_0
+# - it appears to be 7 for TrPlayerPawn_0
+
+TrInventoryManagerProps = MappingProxyType({
+    '01111': {'name': 'Instigator',
+               'type': bitarray,
+               'size': 10},
+    '11111': {'name': 'Owner',
+               'type': bitarray,
+               'size': 10},
+    '10101': {'name': 'InventoryChain',
+               'type': bitarray,
+               'size': 11},
+})
+
+TrPlayerPawnProps = MappingProxyType({
+    '1010000': {'name': 'bNetOwner',
+                'type': bool},
+    '1101000': {'name': 'RemoteRole',
+                'type': bitarray,
+                'size': 2},
+    '1111000': {'name': 'Owner',
+                'type': bitarray,
+                'size': 11},
+    '1100100': {'name': 'Rotation',
+                'type': bitarray,
+                'size': 11},
+    '1001100': {'name': 'InvManager',
+                'type': bitarray,
+                'size': 11},
+    '0111100': {'name': 'PlayerReplicationInfo',
+                'type': bitarray,
+                'size': 11},
+    '1111100': {'name': 'HealthMax',
+                'type': int},
+    '0000010': {'name': 'Health',
+                'type': int},
+    '1000010': {'name': 'AirControl',
+                'type': int},
+    '0110010': {'name': 'GroundSpeed',
+                'type': int},
+    '1101010': {'name': 'bCanSwatTurn',
+                'type': bool},
+    '0011010': {'name': 'bSimulateGravity',
+                'type': bool},
+    '1111010': {'name': 'Controller',
+                'type': bitarray,
+                'size': 11},
+    # size varies:
+    # 10101000000
+    # 000
+    '1000110': {'name': 'CompressedBodyMatColor',
+                'type': bitarray,
+                'size': 3},
+    '0100110': {'name': 'ClientBodyMatDuration',
+                'type': int},
+    '0101110': {'name': 'LastTakeHitInfo',
+                'type': bitarray,
+                'size': 139},
+    '1001001': {'name': 'CurrentWeaponAttachmentClass',
+                'type': int},
+    '1100101': {'name': 'r_fPowerPoolRechargeRate',
+                'type': int},
+    '0010101': {'name': 'r_fMaxPowerPool',
+                'type': int},
+    '1010101': {'name': 'r_fCurrentPowerPool',
+                'type': int},
+    '1000011': {'name': 'r_bDetectedByEnemyScanner',
+                'type': bool},
+    '1100011': {'name': 'r_bIsInvulnerable',
+                'type': bitarray,
+                'size': 1},
+    '1110011': {'name': 'r_bIsSkiing',
+                'type': bitarray,
+                'size': 1},
+    '0111011': {'name': 'RPC ClientUpdateHUDHealth',
+                'type': [
+                    {'name': 'NewHealth',
+                     'type': int},
+                    {'name': 'NewHealthMax',
+                     'type': int}
+                ]},
+    '1111011': {'name': 'RPC PlayHardLandingEffect',
+                'type': bitarray,
+                'size': 53},
+    '1100111': {'name': 'r_nFlashReloadSecondaryWeapon',
+                'type': bitarray,
+                'size': 8}
+})
+
+TrDeviceProps = MappingProxyType({
+    '100001' : { 'name' : 'r_AmmoCount',
+                 'type' : bitarray,
+                 'size' : 64 },
+    '010001' : { 'name' : 'r_bIsReloading',
+                 'type' : bool },
+    '110001' : { 'name' : 'r_bReadyToFire',
+                 'type' : bool },
+    '001001' : { 'name' : 'r_eEquipAt',
+                 'type' : bitarray,
+                 'size' : 4 },
+    '111101' : { 'name' : 'Owner',
+                 'type' : bitarray,
+                 'size' : 10 },
+    '101011' : { 'name' : 'InvManager',
+                 'type' : bitarray,
+                 'size' : 10 },
+    '011011' : { 'name' : 'Inventory',
+                 'type' : bitarray,
+                 'size' : 10 },
+})
+
+TrRadarStationProps = MappingProxyType({
+    '000111': {'name': 'r_bReset',
+               'type': bitarray,
+               'size': 7},
+    '010111': {'name': 'r_ShieldHealth',
+               'type': bitarray,
+               'size': 31}
+})
+
+TrInventoryStationProps = MappingProxyType({
+    '000111': {'name': 'r_bReset',
+               'type': bitarray,
+               'size': 7},
+})
+
+TrRepairStationProps = MappingProxyType({
+    '000111': {'name': 'r_bReset',
+               'type': bitarray,
+               'size': 7},
+})
+
+# unsure
+TrInventoryStationCollisionProps = MappingProxyType({
+    # '101100' : { 'name' : 'RelativeLocation2',
+    #              'type' : bitarray,
+    #              'size' : 2 },
+    # '001001' : { 'name' : 'RelativeLocation',
+    #              'type' : bitarray,
+    #              'size' : 10 },
+    # '011111' : { 'name': 'Base',
+    #              'type': bitarray,
+    #              'size': 30},
+})
+TrPowerGeneratorProps = MappingProxyType({
+    '111110' : { 'name' : 'r_MaxHealth',
+                 'type' : bitarray,
+                 'size' : 31 }
+})
+
+# TODO: It looks like RPC identifiers are only 6 bits when sent along with properties.
+# When sent along with a counter, we need more bits to distinguish between them.
+TrPlayerControllerProps = MappingProxyType({
+    '01000000': {'name': 'bCollideWorld',
+                 'type': bitarray,
+                 'size': 2},
+    '11000000': {'name': 'RPC ClientMatchOver',
+                 'type': [
+                     {'name': 'unknown',
+                      'type': 'flag'},
+                     {'name': 'Winner',
+                      'type': int},
+                     {'name': 'WinnerName',
+                      'type': str}
+                 ]},
+    '00100000': {'name': '!!!!!!!!!INTERESTING Unknown INTERESTING!!!!!!!!!',
+                 'type': bitarray,
+                 'size': 10},
+    '00110000': {'name': 'RPC ClientSetLastDamagerInfo',
+                 'type': bitarray,
+                 'size': 35},
+    # '10001000': {'name': 'RPC ClientPlayerResettingAndRespawning',
+    #            'type': bitarray,
+    #            'size': 1},
+    '10101000': {'name': 'PlayerReplicationInfo',
+                 'type': bitarray,
+                 'size': 11},
+    '01100000': {'name': 'RPC UpdateMatchCountdown',
+                 'type': [
+                     {'name': 'unknown',
+                      'type': 'flag'},
+                     {'name': 'Seconds',
+                      'type': int}
+                 ]},
+    '01101000': {'name': 'Pawn',
+                 'type': bitarray,
+                 'size': 11},
+    '00011000': {'name': 'RPC ClientSetRotation',
+                 'type': bitarray,
+                 'size': 2},
+    '01011000': {'name': 'RPC ClientSwitchToBestWeapon',
+                 'type': bitarray,
+                 'size': 1},
+    # # variable length, so currently it screws up what follows
+    '00100100': {'name': 'RPC ClientGotoState',
+                 'type': [
+                     {'name': 'NewState',
+                      'type': bitarray,
+                      'size': 11},
+                     {'name': 'NewLabel',
+                      'type': bitarray,
+                      'size': 11}
+                 ]},
+    '01100100': {'name': 'RPC GivePawn',
+                 'type': [
+                     {'name': 'NewPawn',
+                      'type': bitarray,
+                      'size': 11}
+                 ]},
+    # the size of this one varies... these appear to be valid:
+    # 1 01100110010011100000000000000000 1 11000000000000000000000000000000 1 11110000000 0 1 10101000000
+    # 1 01101100100010010100000000000000 1 10000000000000000000000000000000 0 1 11110000000 1 01000111110001010100000000000000
+    # 1 01111111000010110100000000000000 1 00000000100000000000000000000000 1 11110000000 0 0
+    # 1 01111111000010110100000000000000 1 10100000000000000000000000000000 0 0 0
+    # 1 00000000011111101100000000000000 1 11100000000000000000000000000000 0 0 0
+    '10010100': {'name': 'RPC ReceiveLocalizedMessage',
+                 'type': [
+                     {'name': 'Message',
+                      'type': int},
+                     {'name': 'Switch',
+                      'type': int},
+                     {'name': 'RelatedPRI_1',
+                      'type': bitarray,
+                      'size': 11},
+                     {'name': 'RelatedPRI_2',
+                      'type': int},
+                     {'name': 'OptionalObject',
+                      'type': bitarray,
+                      'size': 11},
+                 ]},
+    # '11010100': {'name': 'RPC ClientHearSound',
+    #            'type': bitarray,
+    #            'size': 48},
+    '11011100': {'name': 'RPC VeryShortClientAdjustPosition',
+                 'type': [
+                     {'name': 'TimeStamp',
+                      'type': float},
+                     {'name': 'NewLocX',
+                      'type': float},
+                     {'name': 'NewLocY',
+                      'type': float},
+                     {'name': 'NewLocZ',
+                      'type': float},
+                     {'name': 'newBase',
+                      'type': bitarray,
+                      'size': 32}
+                 ]},
+    '00111100': {'name': 'RPC ShortClientAdjustPosition',
+                 'type': [
+                     {'name': 'TimeStamp',
+                      'type': float},
+                     {'name': 'newState',
+                      'type': bitarray,
+                      'size': 11},
+                     {'name': 'newPhysics',
+                      'type': bitarray,
+                      'size': 4},
+                     {'name': 'NewLocX',
+                      'type': float},
+                     {'name': 'NewLocY',
+                      'type': float},
+                     {'name': 'NewLocZ',
+                      'type': float},
+                     {'name': 'newBase',
+                      'type': bitarray,
+                      'size': 32}
+                 ]},
+    '01111100': {'name': 'RPC ClientAckGoodMove',
+                 'type': [
+                     {'name': 'TimeStamp',
+                      'type': float}
+                 ]},
+    '11111100': {'name': 'RPC ClientAdjustPosition',
+                 'type': [
+                     {'name': 'TimeStamp',
+                      'type': float},
+                     {'name': 'newState',
+                      'type': bitarray,
+                      'size': 11},
+                     {'name': 'newPhysics',
+                      'type': bitarray,
+                      'size': 4},
+                     {'name': 'NewLocX',
+                      'type': float},
+                     {'name': 'NewLocY',
+                      'type': float},
+                     {'name': 'NewLocZ',
+                      'type': float},
+                     {'name': 'NewVelX',
+                      'type': float},
+                     {'name': 'NewVelY',
+                      'type': float},
+                     {'name': 'NewVelZ',
+                      'type': float},
+                     {'name': 'newBase',
+                      'type': bitarray,
+                      'size': 32}
+                 ]},
+
+    # reliable client function ClientGameEnded(optional Actor EndGameFocus, optional bool bIsWinner)
+    '00110010': {'name': 'RPC ClientGameEnded',
+                 'type': bitarray,
+                 'size': 2},
+#                         'type': [
+#                             {'name': 'param1',
+#                              'type': bool},
+#                             {'name': 'param2',
+#                              'type': bool}
+#                          ]},
+    # 110101110000 100000000000000000000000000000000100000000000000000000000000000000100
+    # 110100000000 100000000000000000000000000000000100000000000000000000000000000000100
+    # 100001010000 101011110000000000000 100000000000000000000000000000000100000000000000000000000000000000100
+    '10110010': {'name': 'RPC ClientSetViewTarget',
+                 # 'type': [
+                 #     {'name': 'PlayerReplicationInfo',
+                 #      'type': bitarray,
+                 #      'size': 11},
+                 #     {'name':
+                 'type': bitarray,
+                 'size': 81},
+    '11101010': {'name': 'RPC ClientPlayForceFeedbackWaveform',
+                 'type': [
+                     {'name': 'FFWaveform',
+                      'type': int},
+                     {'name': 'FFWaveformInstigator',
+                      'type': None}
+                 ]},
+    # '00111010': {'name': 'bNetOwner',
+    #            'type': bitarray,
+    #            'size': 2},
+    '10110110': {'name': 'RPC ClientWriteLeaderboardStats',
+                 'type': [
+                     {'name': 'OnlineStatsWriteClass',
+                      'type': None}
+                 ]},
+    '11101110': {'name': 'RPC ClientEndOnlineGame',
+                 'type': 'flag'},
+    # '01110001': {'name': 'Rotation',
+    #              'type': bitarray,
+    #              'size': 12},
+    '01001001': {'name': 'RPC PlayStartupMessage',
+                 'type': [
+                     {'name': 'StartupStage',
+                      'type': bitarray,
+                      'size': 8}
+                 ]},
+    # varies in size:
+    # 11110100000011001111001101000110101011111101100000110001010100000000000000
+    # 0101111110101011001010001010100000000000000
+    '11001001': {'name': 'RPC ClientPlayTakeHit',
+                 'type': bitarray,
+                 'size': 43},
+    # '00101001': {'name': 'RPC ClientSetBehindView',
+    #              'type': bitarray,
+    #              'size': 1},
+    # '11011001': {'name': 'RPC ClientPawnDied',
+    #              'type': 'flag'},
+    # '00011101': {'name': 'RemoteRole',
+    #              'type': bitarray,
+    #              'size': 3},
+    '00101011': {'name': 'RPC ClientEndTeamSelect',
+                 'type': [
+                     {'name': 'RequestedTeamNum',
+                      'type': int}
+                 ]},
+    '10111101': {'name': 'r_nCurrentCredits',
+                 'type': bitarray,
+                 'size': 32},
+    '01000011': {'name': 'r_bNeedLoadout',
+                 'type': bool},
+    '11000011': {'name': 'r_bNeedTeam',
+                 'type': bool},
+    '11100011': {'name': 'RPC ClientSeekingMissileTargetingSelfEvent',
+                 'type': [
+                     {'name': 'EventSwitch',
+                      'type': int}
+                 ]},
+})
+
+TrBaseTurretProps = MappingProxyType({
+    '010001': {'name': 'r_TargetPawn',
+               'type': bitarray,
+               'size': 11},
+    '110001': {'name': 'r_FlashCount',
+               'type': bitarray,
+               'size': 8},
+    '000111': {'name': 'r_bReset',
+               'type': bitarray,
+               'size': 7},
+    '010111': {'name': 'r_ShieldHealth',
+               'type': bitarray,
+               'size': 31}
+})
+
+TrProj_BaseTurretProps = MappingProxyType({
+    '011100' : { 'name' : 'Rotation',
+                 'type' : bitarray,
+                 'size' : 18 },
+    '000001' : { 'name' : 'Velocity',
+                 'type' : bitarray,
+                 'size' : 42 }
+})
+
+TrProj_SpinfusorProps = MappingProxyType({
+    '10000': {'name': 'bCollideActors',
+              'type': bool},
+    #'10000': {'name': 'bNetOwner',
+    #          'type': bool},
+    '11100': {'name': 'bTearOff',
+              'type': bool},
+    '10110': {'name': 'Base',
+              'type': bitarray,
+              'size': 31},
+    '10011': {'name': 'r_vSpawnLocation',
+              'type': bitarray,
+              'size': 52}
+})
+
+TrDroppedPickupProps = MappingProxyType({
+    '101101' : { 'name' : 'InventoryClass',
+                 'type' : bitarray,
+                 'size' : 31 },
+    '011101' : { 'name' : 'Base',
+                 'type' : bitarray,
+                 'size' : 30 },
+    '110011' : { 'name' : 'Rotation',
+                 'type' : bitarray,
+                 'size' : 10 },
+    '101011' : { 'name' : 'bFadeOut',
+                 'type' : 'flag' }
+})
+
+TrGameReplicationInfoProps = MappingProxyType({
+    '000000' : { 'name' : 'netflags',
+                 'type' : bitarray,
+                 'size' : 5 },
+    '011000' : { 'name' : 'm_Flags',
+                 'type' : bitarray,
+                 'size' : 20 },
+    '101000' : { 'name' : 'r_ServerConfig',
+                 'type' : bitarray,
+                 'size' : 12 },
+    '111000' : { 'name' : 'FlagReturnTime',
+                 'type' : bitarray,
+                 'size' : 41 },
+    '011010' : { 'name' : 'ServerName', 'type' : str },
+    '111010' : { 'name' : 'TimeLimit', 'type' : int },
+    '000110' : { 'name' : 'GoalScore', 'type' : int },
+    '100110' : { 'name' : 'RemainingMinute', 'type' : int },
+    '010110' : { 'name' : 'ElapsedTime', 'type' : int },
+    '110110' : { 'name' : 'RemainingTime', 'type' : int },
+    '101110' : { 'name' : 'bMatchIsOver', 'type' : bool },
+    '111110' : { 'name' : 'bStopCountDown', 'type' : bool },
+    '000001' : { 'name' : 'GameClass', 'type' : int },
+    '100001' : { 'name' : 'MessageOfTheDay', 'type' : str },
+    '010001' : { 'name' : 'RulesString', 'type': str },
+    '001001' : { 'name' : 'FlagState',
+                 'type' : bitarray,
+                 'size' : 10,
+                 'values' : { '0000000000' : 'Enemy flag on stand',
+                              '0000000001' : 'Enemy flag taken',
+                              '0000000011' : 'Enemy flag dropped',
+                              '1000000000' : 'Own flag on stand',
+                              '1000000001' : 'Own flag taken',
+                              '1000000011' : 'Own flag dropped' } },
+    '111001' : { 'name' : 'bAllowKeyboardAndMouse', 'type' : bool },
+    '010101' : { 'name' : 'bWarmupRound', 'type' : bool },
+    '001101' : { 'name' : 'MinNetPlayers', 'type' : int },
+    '101111' : { 'name' : 'r_nBlip',
+                 'type' : bitarray,
+                 'size' : 8 },
+})
+
+TrFlagCTFProps = MappingProxyType({
+    '10000' : { 'name' : 'bCollideActors', 'type' : bool},
+    '11000' : { 'name' : 'bHardAttach', 'type' : bool},
+    '00010' : { 'name' : 'Physics',
+                 'type' : bitarray,
+                 'size' : 4 },
+    '00001' : { 'name' : 'Location',
+                 'type' : bitarray,
+                 'size' : 52 },
+    '10001' : { 'name' : 'RelativeLocation',
+                 'type' : bitarray,
+                 'size' : 22 },
+    '11001' : { 'name' : 'Rotation',
+                 'type' : bitarray,
+                 'size' : 11 },
+    '00101' : { 'name' : 'Velocity',
+                 'type' : bitarray,
+                 'size' : 40 },
+    '10111' : { 'name' : 'Base',
+                 'type' : bitarray,
+                 'size' : 10 },
+    '01000' : { 'name' : 'bCollideWorld', 'type' : bool},
+    '01101' : { 'name' : 'bHome', 'type' : bool},
+    '01001' : { 'name' : 'RelativeRotation',
+                'type' : bitarray,
+                'size' : 27 },
+    '11101' : { 'name' : 'Team',
+                'type' : bitarray,
+                'size' : 11 },
+    '00011' : { 'name' : 'HolderPRI',
+                'type' : bitarray,
+                'size' : 11 }
+})
+
+TrPlayerReplicationInfoProps = MappingProxyType({
+    '000000' : { 'name' : 'netflags',
+                 'type' : bitarray,
+                 'size' : 5 },
+    '000010' : { 'name' : 'Location',
+                 'type' : bitarray,
+                 'size' : 51 },
+    '110010' : { 'name' : 'Rotation',
+                 'type' : bitarray,
+                 'size' : 10 },
+    '101010' : { 'name' : 'UniqueId',
+                 'type' : bitarray,
+                 'size' : 64 },
+    '011010' : { 'name' : 'Unknown field',
+                 'type' : int },
+    '110110' : { 'name' : 'bWaitingPlayer', 'type' : bool },
+    '000110' : { 'name' : 'bBot', 'type' : bool },
+    '101110' : { 'name' : 'bIsSpectator', 'type' : bool },
+    '111110' : { 'name' : 'Team (11 bits)',
+                 'type' : bitarray,
+                 'size' : 11,
+                 'values' : { '10001000000' : 'DiamondSword',
+                              '11110000000' : 'BloodEagle' } },
+    '000001' : { 'name' : 'PlayerID', 'type' : int },
+    '100001' : { 'name' : 'PlayerName', 'type' : str },
+    '110001' : { 'name' : 'Deaths', 'type' : int },
+    '001001' : { 'name' : 'Score', 'type' : int },
+    '011001' : { 'name' : 'CharClassInfo', 'type' : int },
+    '010101' : { 'name' : 'bHasFlag', 'type': bool},
+    '101101' : { 'name' : 'r_bSkinId', 'type': int},
+    '111101' : { 'name' : 'r_EquipLevels',
+                 'type' : bitarray,
+                 'size' : 48},
+    '000011' : { 'name' : 'r_VoiceClass', 'type': int},
+    '001011' : { 'name' : 'm_nPlayerClassId', 'type': int},
+    '101011' : { 'name' : 'm_nCreditsEarned', 'type': int},
+    '000111' : { 'name' : 'm_nPlayerIconIndex', 'type': int},
+    '001111' : { 'name' : 'm_PendingBaseClass', 'type': int},
+    '101111' : { 'name' : 'm_CurrentBaseClass', 'type': int},
+
+})
+
+TrServerSettingsInfoProps = MappingProxyType({
+#            '000000': {'name': 'fFriendlyFireDamageMultiplier',
+#                       'type': bitarray,
+#                       'size': 31},
+#            ''
+})
+
+FirstClientObjectProps = MappingProxyType({
+    '000100' : { 'name' : 'prop8',
+                 'type' : bitarray,
+                 'size' : 162 },
+})
+
+FirstServerObjectProps = MappingProxyType({
+    '10000000': {'name': 'mysteryproperty3',
+                 'type': PropertyValueMystery3},
+    '11000000': {'name': 'mysteryproperty5',
+                 'type': (
+                     {'name': 'unknown',
+                      'type': int},
+                     {'name': 'unknown2',
+                      'type': str}
+                 )},
+    '00100000': {'name': 'mysteryproperty4',
+                 'type': (
+                     {'name': 'unknown',
+                      'type': bitarray,
+                      'size': 88},
+                     {'name': 'server url',
+                      'type': str}
+                 )},
+    '11100000': {'name': 'mysteryproperty1',
+                 'type': PropertyValueMystery1},
+    '11010000': {'name': 'mysteryproperty2',
+                 'type': PropertyValueMystery2},
+    '10111000': {'name': 'interestingproperty',
+                 'type': PropertyValueInteresting}
+})
+
+MatineeActorProps = MappingProxyType({
+    '00000': {'name': 'netflags',
+              'type': bitarray,
+              'size': 6},
+    '11101': {'name': 'Position',
+              'type': bitarray,
+              'size': 32},
+    '00011': {'name': 'PlayRate',
+              'type': int},
+    '11011': {'name': 'bIsPlaying',
+              'type': bool},
+    '00111': {'name': 'InterpAction',
+              'type': bitarray,
+              'size': 32}
+})
+
+UTTeamInfoFlags = MappingProxyType({
+    '00000': {'name': 'netflags',
+              'type': bitarray,
+              'size': 6},
+    '10101': {'name': 'TeamIndex',
+              'type': int},
+    '00011': {'name': 'TeamFlag',
+              'type': bitarray,
+              'size': 11},
+    '10011': {'name': 'HomeBase',
+              'type': int}
+})
+
+WorldInfo2Props = MappingProxyType({
+    '00011': {'name': 'TimeDilation',
+              'type': int},
+    '01101': {'name': 'WorldGravityZ',
+              'type': int}
+})
+
+CLASS_DICT = MappingProxyType({
+    None:                               {'name': 'FirstServerObject', 'props': FirstServerObjectProps},
+    '00001000100000000111111011011000': {'name': 'FirstClientObject', 'props': FirstClientObjectProps},
+    '10001000000000000000000000000000': {'name': 'FirstServerObject', 'props': FirstServerObjectProps},
+    '00101100100100010000000000000000': {'name': 'MatineeActor', 'props': MatineeActorProps},
+    '00011100001100100100000000000000': {'name': 'TrBaseTurret_BloodEagle', 'props': TrBaseTurretProps},
+    '00111100001100100100000000000000': {'name': 'TrBaseTurret_DiamondSword', 'props': TrBaseTurretProps},
+    '01010111000101011110000000000000': {'name': 'TrCTFBase_BloodEagle', 'props': {}},
+    '00110111000101011110000000000000': {'name': 'TrCTFBase_DiamondSword', 'props': {}},
+    '01111000100110010100000000000000': {'name': 'TrDevice_Blink', 'props': TrDeviceProps},
+    '01000011100110010100000000000000': {'name': 'TrDevice_ConcussionGrenade', 'props': TrDeviceProps},
+    '01100101110110010100000000000000': {'name': 'TrDevice_GrenadeLauncher_Light', 'props': TrDeviceProps},
+    '00111001001110010100000000000000': {'name': 'TrDevice_Twinfusor', 'props': TrDeviceProps},
+    '01001000101110010100000000000000': {'name': 'TrDevice_LaserTargeter', 'props': TrDeviceProps},
+    '01101100101110010100000000000000': {'name': 'TrDevice_LightAssaultRifle', 'props': TrDeviceProps},
+    '01111100101110010100000000000000': {'name': 'TrDevice_LightSpinfusor', 'props': TrDeviceProps},
+    '00100111101110010100000000000000': {'name': 'TrDevice_Melee_DS', 'props': TrDeviceProps},
+    '01011001000001010100000000000000': {'name': 'TrDevice_Spinfusor_100X', 'props': TrDeviceProps},
+    '01011000100001010100000000000000': {'name': 'TrDevice_UtilityPack_Soldier', 'props': TrDeviceProps},
+    '01110101110110010100000000000000': {'name': 'TrDevice_GrenadeXL', 'props': TrDeviceProps},
+    '01001011001001010100000000000000': {'name': 'TrDroppedPickup', 'props': TrDroppedPickupProps},
+    '00100100101111010100000000000000': {'name': 'TrFlagCTF_BloodEagle', 'props': TrFlagCTFProps},
+    '00110100101111010100000000000000': {'name': 'TrFlagCTF_DiamondSword', 'props': TrFlagCTFProps},
+    '01110001101110110100000000000000': {'name': 'TrGameReplicationInfo', 'props': TrGameReplicationInfoProps},
+    '01101101010100001100000000000000': {'name': 'TrInventoryManager', 'props': TrInventoryManagerProps},
+    '01010000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0101?', 'props': TrInventoryStationProps},
+    '01000000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0100?', 'props': TrInventoryStationProps},
+    '01100000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0110?', 'props': TrInventoryStationProps},
+    '00100000100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0010?', 'props': TrInventoryStationProps},
+    #'00010010100101011110000000000000': {'name': 'TrInventoryStation_BloodEagle0001?', 'props': TrInventoryStationProps},
+    '01001000100101011110000000000000': {'name': 'TrInventoryStation_DiamondSword', 'props': TrInventoryStationProps},
+    '01001011110100001100000000000000': {'name': 'TrInventoryStationCollision', 'props': TrInventoryStationCollisionProps},
+    '00110001010000010100000000000000': {'name': 'TrPlayerController', 'props': TrPlayerControllerProps},
+    '00111010100001100100000000000000': {'name': 'TrPlayerPawn', 'props': TrPlayerPawnProps},
+    '00000110101111001100000000000000': {'name': 'TrPlayerReplicationInfo', 'props': TrPlayerReplicationInfoProps},
+    '00111100100101011110000000000000': {'name': 'TrPowerGenerator_BloodEagle', 'props': TrPowerGeneratorProps},
+    '01111100100101011110000000000000': {'name': 'TrPowerGenerator_DiamondSword', 'props': TrPowerGeneratorProps},
+    '01111010010000101100000000000000': {'name': 'TrProj_BaseTurret', 'props': TrProj_BaseTurretProps},
+    '00101010111000101100000000000000': {'name': 'TrProj_Spinfusor_100X', 'props': TrProj_SpinfusorProps},
+    '01110010100010101100000000000000': {'name': 'TrRadarStation_BloodEagle', 'props': TrRadarStationProps},
+    '01001010100010101100000000000000': {'name': 'TrRadarStation_DiamondSword', 'props': TrRadarStationProps},
+    '00000000110010101100000000000000': {'name': 'TrRepairStationCollision', 'props': TrRepairStationProps},
+    '00010011100001101100000000000000': {'name': 'TrServerSettingsInfo', 'props': TrServerSettingsInfoProps},
+    '00000011110100001100000000000000': {'name': 'TrStationCollision', 'props': {}},
+    '00100010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0010?', 'props': TrRepairStationProps},
+    '01010010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0101?', 'props': TrRepairStationProps},
+    '00110010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0011?', 'props': TrRepairStationProps},
+    '01100010100101011110000000000000': {'name': 'TrRepairStation_BloodEagle0110?', 'props': TrRepairStationProps},
+    '01011010100101011110000000000000': {'name': 'TrRepairStation_DiamondSword', 'props': TrRepairStationProps},
+    '00100110100101011110000000000000': {'name': 'TrVehicleStation_BloodEagle', 'props': {}},
+    '01100110100101011110000000000000': {'name': 'TrVehicleStation_DiamondSword', 'props': {}},
+    '00100111010010011000000000000000': {'name': 'UTTeamInfo', 'props': UTTeamInfoFlags},
+    '00000101100101011110000000000000': {'name': 'WorldInfo1', 'props': {}},
+    '01010101111001011110000000000000': {'name': 'WorldInfo2', 'props': WorldInfo2Props}
+})
+
+
+KIND_BOOL = 0
+KIND_INT = 1
+KIND_STR = 2
+KIND_BITS = 3
+KIND_FLAG = 4
+KIND_PARAMS = 5
+KIND_STRUCT = 6
+KIND_FLOAT = 7
+KIND_CUSTOM = 8
+
+_BASIC_KINDS = {
+    bool: KIND_BOOL,
+    int: KIND_INT,
+    str: KIND_STR,
+    bitarray: KIND_BITS,
+    'flag': KIND_FLAG,
+    float: KIND_FLOAT
+}
+
+_VALUE_CLASSES = {
+    KIND_BOOL: PropertyValueBool,
+    KIND_INT: PropertyValueInt,
+    KIND_STR: PropertyValueString,
+    KIND_BITS: PropertyValueBitarray,
+    KIND_FLAG: PropertyValueFlag,
+    KIND_FLOAT: PropertyValueFloat
+}
+
+
+class PropDescriptor():
+    __slots__ = ('name', 'kind', 'size', 'values', 'subfields', 'ops', 'valueclass', 'parse')
+
+    def __init__(self, name, kind = None, size = None, values = None, subfields = None, valueclass = None):
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.values = values
+        self.subfields = subfields
+        self.ops = None
+        self.valueclass = valueclass
+        self.parse = None
+
+
+UNKNOWN_PROPERTY = PropDescriptor('Unknown')
+
+
+def _compile_op(member):
+    # A function that parses one value of the member and returns it. The value
+    # class and size are fixed per member, only bitarray members take a size.
+    valueclass = member.valueclass or _VALUE_CLASSES.get(member.kind, None)
+    size = member.size if member.kind == KIND_BITS else None
+    # Bitarray values that fit in an int are kept as one
+    if size is not None and size <= 32:
+        valueclass = PropertyValueSmallBitarray
+
+    if valueclass is None:
+        def parse(reader, debug):
+            raise RuntimeError('Coding error: propertytype of property %s has invalid value: %s' % (member.name, member.kind))
+    elif size is None:
+        rawparse = valueclass.frombitarray.__wrapped__
+        def parse(reader, debug):
+            value = valueclass()
+            if debug:
+                value.frombitarray(reader, debug = debug)
+            else:
+                rawparse(value, reader)
+            return value
+    else:
+        rawparse = valueclass.frombitarray.__wrapped__
+        def parse(reader, debug):
+            value = valueclass()
+            if debug:
+                value.frombitarray(reader, size, debug = debug)
+            else:
+                rawparse(value, reader, size)
+            return value
+    return parse
+
+
+def _compile_ops(subfields):
+    # Struct and params members are parsed one after the other for every RPC,
+    # so turn them into a flat sequence of parse functions
+    return tuple(_compile_op(member) for member in subfields)
+
+
+def _compile_descriptor(property_):
+    propertytype = property_.get('type', None)
+    # The same names are used in many classes, so share a single copy of each
+    propertyname = property_.get('name', None)
+    if propertyname is not None:
+        propertyname = sys.intern(propertyname)
+    descriptor = PropDescriptor(propertyname,
+                                size = property_.get('size', None))
+    propertyvalues = property_.get('values', None)
+    if propertyvalues:
+        # Choices are looked up by the integer value of the bits that were read
+        descriptor.values = {int(valuekey[::-1], 2) : value for valuekey, value in propertyvalues.items()}
+    if isinstance(propertytype, list):
+        descriptor.kind = KIND_PARAMS
+        descriptor.subfields = tuple(_compile_descriptor(member) for member in propertytype)
+        descriptor.ops = _compile_ops(descriptor.subfields)
+    elif isinstance(propertytype, tuple):
+        descriptor.kind = KIND_STRUCT
+        descriptor.subfields = tuple(_compile_descriptor(member) for member in propertytype)
+        descriptor.ops = _compile_ops(descriptor.subfields)
+    elif propertytype in _BASIC_KINDS:
+        descriptor.kind = _BASIC_KINDS[propertytype]
+    elif propertytype is not None:
+        descriptor.kind = KIND_CUSTOM
+        descriptor.valueclass = propertytype
+    return descriptor
+
+
+def _compile_parser(descriptor):
+    # Build a function that parses this particular property into an
+    # ObjectProperty, so that how to parse it is only decided once.
+    # Returns None for properties that can't be parsed.
+    if descriptor.values:
+        size = descriptor.size
+        values = descriptor.values
+        def parse(objectproperty, reader, debug):
+            objectproperty.value = PropertyValueMultipleChoice()
+            objectproperty.value.frombitarray(reader, size, values, debug = debug)
+
+    elif descriptor.kind == KIND_PARAMS or descriptor.kind == KIND_STRUCT:
+        valueclass = PropertyValueParams if descriptor.kind == KIND_PARAMS else PropertyValueStruct
+        subfields = descriptor.subfields
+        ops = descriptor.ops
+        def parse(objectproperty, reader, debug):
+            objectproperty.value = valueclass(subfields, ops)
+            objectproperty.value.frombitarray(reader, debug = debug)
+
+    elif descriptor.kind is not None:
+        parsevalue = _compile_op(descriptor)
+        def parse(objectproperty, reader, debug):
+            try:
+                objectproperty.value = parsevalue(reader, debug)
+            except:
+                objectproperty.value = PropertyValueBitarray()
+                raise
+
+    else:
+        parse = None
+
+    return parse
+
+
+def _compile_class(class_):
+    # Property IDs are looked up while parsing, so turn the bitstring keys into
+    # tables that can be indexed directly with the integer value of the ID
+    props = class_['props']
+    idsize = len(next(iter(props))) if props else 6
+    if any(len(propertykey) != idsize for propertykey in props):
+        raise RuntimeError('Coding error: property IDs of class %s do not all have the same size' % class_['name'])
+    props_table = [UNKNOWN_PROPERTY] * (1 << idsize)
+    for propertykey, property_ in props.items():
+        propertyid = int(propertykey[::-1], 2)
+        descriptor = _compile_descriptor(property_)
+        props_table[propertyid] = descriptor
+        descriptor.parse = _compile_parser(descriptor)
+    class_['idsize'] = idsize
+    class_['props_table'] = tuple(props_table)
+
+
+for class_ in CLASS_DICT.values():
+    _compile_class(class_)
+
+# The same classes by the integer value of their class key, which is how
+# they are looked up while parsing
+CLASS_TABLE = MappingProxyType({ (int(classkey[::-1], 2) if classkey is not None else None) : class_
+                                 for classkey, class_ in CLASS_DICT.items() })
+
+
+# Channel numbers are sent as 10 bits, so each number is an index into a list
+CHANNEL_BITS = 10
+
+class ParserState():
+    def __init__(self):
+        # The class table itself is read-only and compiled once at import,
+        # but classes that are not in it yet are added while parsing and the
+        # channels are per connection, so ParserState can't be shared
+        self.class_dict = dict(CLASS_TABLE)
+        self.instance_count = defaultdict(int)
+        self.channels = [None] * (1 << CHANNEL_BITS)
+
+
 class ObjectProperty():
+    __slots__ = ('propertyid_size', 'propertyid', 'property_', 'value')
+
     def __init__(self, id_size = 6):
         self.propertyid_size = id_size
         self.propertyid = None
-        self.property_ = { 'name' : 'Unknown' }
+        self.property_ = UNKNOWN_PROPERTY
         self.value = None
 
     @debugbits
-    def frombitarray(self, bits, class_, debug = False):
-        propertyidbits, bits = getnbits(self.propertyid_size, bits)
-        self.propertyid = toint(propertyidbits)
+    def frombitarray(self, reader, class_, debug = False):
+        self.propertyid = reader.readint(self.propertyid_size)
         
-        propertykey = propertyidbits.to01()
-        property_ = class_['props'].get(propertykey, {'name' : 'Unknown'})
-        self.property_ = property_
-
-        propertyname = property_.get('name', None)
-        propertytype = property_.get('type', None)
-        propertysize = property_.get('size', None)
-        propertyvalues = property_.get('values', None)
-        if propertyvalues:
-            self.value = PropertyValueMultipleChoice()
-            bits = self.value.frombitarray(bits, propertysize, propertyvalues, debug = debug)
-        
-        elif propertytype:
-            if isinstance(propertytype, list):
-                self.value = PropertyValueParams(propertytype)
-                bits = self.value.frombitarray(bits, debug=debug)
-            elif isinstance(propertytype, tuple):
-                self.value = PropertyValueStruct(propertytype)
-                bits = self.value.frombitarray(bits, debug=debug)
-            else:
-                try:
-                    self.value, bits = parse_basic_property(propertyname, propertytype, bits, propertysize, debug = debug)
-                except:
-                    self.value = PropertyValueBitarray()
-                    raise
-        else:
+        self.property_ = class_['props_table'][self.propertyid]
+        parse = self.property_.parse
+        if parse is None:
             raise ParseError('Unknown property %s for class %s' %
-                                 (propertykey, class_['name']),
-                             bits)
-        
-        return bits
+                                 (int2bitarray(self.propertyid, self.propertyid_size).to01(), class_['name']),
+                             reader)
+
+        parse(self, reader, debug)
 
     def tobitarray(self):
         bits = bitarray(endian='little')
         if self.propertyid is not None:
-            bits.extend(int2bitarray(self.propertyid, self.propertyid_size))
+            bits.extend(_fieldbits(self.propertyid, self.propertyid_size))
         if self.value is not None:
             bits.extend(self.value.tobitarray())
         return bits
@@ -1445,26 +1711,29 @@ class ObjectProperty():
             propertykey = int2bitarray(self.propertyid, self.propertyid_size).to01()
             text += '%s%s (property = %s)\n' % (indent_prefix,
                                                propertykey,
-                                               self.property_['name'])
+                                               self.property_.name)
         if self.value is not None:
             text += self.value.tostring(indent = indent + len(propertykey))
         return text
 
 class ObjectInstance():
+    __slots__ = ('class_', 'properties', 'is_rpc')
+
     def __init__(self, is_rpc = False):
         self.class_ = None
         self.properties = []
         self.is_rpc = is_rpc
     
     @debugbits
-    def frombitarray(self, bits, class_, state, debug = False):
+    def frombitarray(self, reader, class_, state, debug = False):
         
-        while bits:
-            property_ = ObjectProperty(id_size = class_['idsize'])
+        idsize = class_['idsize']
+        # Leave out the debugbits wrapper for each property unless debugging
+        parseproperty = ObjectProperty.frombitarray if debug else ObjectProperty.frombitarray.__wrapped__
+        while reader.pos < reader.end:
+            property_ = ObjectProperty(id_size = idsize)
             self.properties.append(property_)
-            bits = property_.frombitarray(bits, class_, debug = debug)
-
-        return bits
+            parseproperty(property_, reader, class_, debug = debug)
 
     def tobitarray(self):
         bits = bitarray(endian = 'little')
@@ -1477,35 +1746,41 @@ class ObjectInstance():
         return ''.join(items)
 
 class ObjectClass():
+    __slots__ = ('classid',)
+
     def __init__(self):
         self.classid = None
 
     def getclasskey(self):
-        classbits = int2bitarray(self.classid, 32)
-        if classbits[0:5] == bitarray('10001'):
-            classbits[5:] = False
-        return classbits.to01()
+        # Only the first 5 bits matter for classes starting with 10001
+        if self.classid & 0x1F == 0x11:
+            return 0x11
+        return self.classid
 
     @debugbits
-    def frombitarray(self, bits, state, debug = False):
-        classbits, bits = getnbits(32, bits)
-        self.classid = toint(classbits)
+    def frombitarray(self, reader, state, debug = False):
+        self.classid = reader.readint32()
         
         classkey = self.getclasskey()
         if classkey not in state.class_dict:
             classname = 'unknown%d' % len(state.class_dict)
-            state.class_dict[classkey] = { 'name' : classname,
-                                           'props' : {} }
-
-        return bits
+            class_ = { 'name' : classname,
+                       'props' : {} }
+            _compile_class(class_)
+            state.class_dict[classkey] = class_
 
     def tobitarray(self):
         bits = bitarray(endian = 'little')
         if self.classid is not None:
-            bits.extend(int2bitarray(self.classid, 32))
+            bits.extend(_fieldbits(self.classid, 32))
         return bits
 
+# Payload sizes from 00000000001101 upwards are sent with one bit less
+PAYLOADSIZE_LIMIT = toint(bitarray('00000000001101', endian='little'))
+
 class PayloadData():
+    __slots__ = ('reliable', 'size', 'object_class', 'object_deleted', 'instancename', 'instance', 'bitsleftreason', 'bitsleft', 'nr_of_payload_bits')
+
 
     def __init__(self, reliable = False):
         self.reliable = reliable
@@ -1518,63 +1793,58 @@ class PayloadData():
         self.bitsleft = None
 
     @debugbits
-    def frombitarray(self, bits, channel, state, debug = False):
-        payloadsizebits, bits = getnbits(14, bits)
-
-        if toint(payloadsizebits) >= toint(bitarray('00000000001101', endian='little')):
-            payloadsizebits = payloadsizebits[:-1]
-            bits.insert(0, True)
+    def frombitarray(self, reader, channel, state, debug = False):
+        self.nr_of_payload_bits = 14
+        self.size = reader.readint(14)
 
-        self.nr_of_payload_bits = len(payloadsizebits)
-        self.size = toint(payloadsizebits)
+        if self.size >= PAYLOADSIZE_LIMIT:
+            # The size only took 13 bits, so give the last one back
+            self.nr_of_payload_bits = 13
+            self.size &= (1 << 13) - 1
+            reader.pos -= 1
 
-        payloadbits, bits = getnbits(self.size, bits)
-        originalpayloadbits = bitarray(payloadbits)
+        payloadreader = reader.subreader(self.size)
 
         try:
-            if channel not in state.channels:
+            channelinfo = state.channels[channel]
+            if channelinfo is None:
                 newinstance = True
                 self.object_class = ObjectClass()
-                payloadbits = self.object_class.frombitarray(payloadbits, state, debug = debug)
+                self.object_class.frombitarray(payloadreader, state, debug = debug)
 
                 class_ = state.class_dict[self.object_class.getclasskey() if channel != 0 else None]
                 classname = class_['name']
 
-                prop_keys = list(class_['props'].keys())
-                class_['idsize'] = len(prop_keys[0]) if prop_keys else 6
-
-                state.instance_count[classname] = state.instance_count.get(classname, -1) + 1
                 instancename = '%s_%d' % (classname, state.instance_count[classname])
+                state.instance_count[classname] += 1
                 state.channels[channel] = { 'class' : class_,
                                             'instancename' : instancename }
             else:
                 newinstance = False
-                class_ = state.channels[channel]['class']
-                instancename = state.channels[channel]['instancename']
+                class_ = channelinfo['class']
+                instancename = channelinfo['instancename']
 
             self.instancename = instancename
             self.instance = ObjectInstance(is_rpc = self.reliable and not newinstance)
-            payloadbits = self.instance.frombitarray(payloadbits, class_, state, debug = debug)
+            self.instance.frombitarray(payloadreader, class_, state, debug = debug)
             
-            if payloadbits:
+            if payloadreader.remaining():
                 raise ParseError('Bits of payload left over',
-                                 payloadbits)
+                                 payloadreader)
 
             if self.size == 0:
                 self.object_deleted = True
-                del state.channels[channel]
+                state.channels[channel] = None
             
         except ParseError as e:
             self.bitsleftreason = str(e)
             self.bitsleft = e.bitsleft
 
-        return bits
-
     def tobitarray(self):
         bits = bitarray(endian = 'little')
 
         if self.size is not None:
-            bits.extend(int2bitarray(self.size, self.nr_of_payload_bits))
+            bits.extend(_fieldbits(self.size, self.nr_of_payload_bits))
         if self.object_class is not None:
             bits.extend(self.object_class.tobitarray())
         if self.instance is not None:
@@ -1617,6 +1887,8 @@ class PayloadData():
         return text
 
 class ChannelData():
+    __slots__ = ('channel', 'counter', 'unknownbits', 'payload')
+
     def __init__(self):
         self.channel = None
         self.counter = None
@@ -1624,24 +1896,21 @@ class ChannelData():
         self.payload = None
 
     @debugbits
-    def frombitarray(self, bits, with_counter, state, debug = False):
-        channelbits, bits = getnbits(10, bits)
-        self.channel = toint(channelbits)
+    def frombitarray(self, reader, with_counter, state, debug = False):
+        self.channel = reader.readint(CHANNEL_BITS)
 
         if with_counter:
-            counterbits, bits = getnbits(5, bits)
-            self.counter = toint(counterbits)
+            self.counter = reader.readint(5)
 
-            self.unknownbits, bits = getnbits(8, bits)
+            self.unknownbits = reader.read(8)
 
         self.payload = PayloadData(reliable = with_counter)
-        bits = self.payload.frombitarray(bits, self.channel, state, debug = debug)
-        return bits
+        self.payload.frombitarray(reader, self.channel, state, debug = debug)
 
     def tobitarray(self):
-        bits = int2bitarray(self.channel, 10)
+        bits = int2bitarray(self.channel, CHANNEL_BITS)
         if self.counter is not None:
-            bits.extend(int2bitarray(self.counter, 5))
+            bits.extend(_fieldbits(self.counter, 5))
             bits.extend(self.unknownbits)
         bits.extend(self.payload.tobitarray())
         return bits
@@ -1649,7 +1918,7 @@ class ChannelData():
     def tostring(self, indent = 0):
         indent_prefix = ' ' * indent
         items = []
-        items.append('%s (channel = %d)\n' % (int2bitarray(self.channel, 10).to01(),
+        items.append('%s (channel = %d)\n' % (int2bitarray(self.channel, CHANNEL_BITS).to01(),
                                               self.channel))
         indent += 10
         if self.counter is not None:
@@ -1663,6 +1932,8 @@ class ChannelData():
         return text
 
 class PacketData():
+    __slots__ = ('flag1a', 'unknownbits11', 'unknownbits10', 'channel_data')
+
     def __init__(self):
         self.flag1a = None
         self.unknownbits11 = None
@@ -1670,43 +1941,43 @@ class PacketData():
         self.channel_data = None
 
     @debugbits
-    def frombitarray(self, bits, state, debug = False):
+    def frombitarray(self, reader, state, debug = False):
 
-        self.flag1a, bits = getnbits(2, bits)
-        if self.flag1a == bitarray('11'):
+        # The flags are kept as the integer value of their bits, so with
+        # the first bit being the least significant '01' is 2 and '10' is 1
+        self.flag1a = reader.readint(2)
+        if self.flag1a == 3:
             self.unknownbits11 = True
             self.flag1a = None
-            self.flag1a, bits = getnbits(2, bits)
+            self.flag1a = reader.readint(2)
 
-        if self.flag1a == bitarray('00'):
+        if self.flag1a == 0:
             channel_with_counter = False
-        elif self.flag1a == bitarray('01'):
+        elif self.flag1a == 2:
             channel_with_counter = True
-        elif self.flag1a == bitarray('10'):
+        elif self.flag1a == 1:
             channel_with_counter = True
-            self.unknownbits10, bits = getnbits(2, bits)
-            if self.unknownbits10 != bitarray('11'):
+            self.unknownbits10 = reader.readint(2)
+            if self.unknownbits10 != 3:
                 raise ParseError('Unexpected value for unknownbits10: %s' %
-                                     self.unknownbits10.to01(),
-                                 bits)
+                                     int2bitarray(self.unknownbits10, 2).to01(),
+                                 reader)
             
         else:
-            raise ParseError('Unexpected value for flag1a: %s' % self.flag1a.to01(),
-                             bits)
+            raise ParseError('Unexpected value for flag1a: %s' % int2bitarray(self.flag1a, 2).to01(),
+                             reader)
 
         self.channel_data = ChannelData()
-        bits = self.channel_data.frombitarray(bits, channel_with_counter, state, debug = debug)
-            
-        return bits
+        self.channel_data.frombitarray(reader, channel_with_counter, state, debug = debug)
 
     def tobitarray(self):
         bits = bitarray(endian = 'little')
         if self.unknownbits11:
             bits.extend('11')
-        if self.flag1a:
-            bits.extend(self.flag1a)
+        if self.flag1a is not None:
+            bits.extend(_fieldbits(self.flag1a, 2))
         if self.unknownbits10 is not None:
-            bits.extend(self.unknownbits10)
+            bits.extend(_fieldbits(self.unknownbits10, 2))
 
         if self.channel_data:
             bits.extend(self.channel_data.tobitarray())
@@ -1719,10 +1990,10 @@ class PacketData():
         if self.unknownbits11 is not None:
             items.append('11 (flag1a = 3)\n')
         if self.flag1a is not None:
-            items.append('%s (flag1a = %d)\n' % (self.flag1a.to01(),
-                                                 toint(self.flag1a)))
+            items.append('%s (flag1a = %d)\n' % (int2bitarray(self.flag1a, 2).to01(),
+                                                 self.flag1a))
         if self.unknownbits10 is not None:
-            items.append('%s\n' % self.unknownbits10.to01())
+            items.append('%s\n' % int2bitarray(self.unknownbits10, 2).to01())
                          
         text = ''.join(['%s%s' % (indent_prefix, item) for item in items])
         if self.channel_data is not None:
@@ -1730,14 +2001,14 @@ class PacketData():
         return text
 
 class PacketAck():
+    __slots__ = ('acknr',)
+
     def __init__(self):
         self.acknr = None
 
     @debugbits
-    def frombitarray(self, bits, debug = False):
-        acknrbits, bits = getnbits(14, bits)
-        self.acknr = toint(acknrbits)
-        return bits
+    def frombitarray(self, reader, debug = False):
+        self.acknr = reader.readint(14)
 
     def tobitarray(self):
         return int2bitarray(self.acknr, 14)
@@ -1749,44 +2020,52 @@ class PacketAck():
                                          self.acknr))
 
 class Packet():
+    __slots__ = ('seqnr', 'parts', 'paddingbits')
+
     def __init__(self):
         self.seqnr = None
         self.parts = []
         self.paddingbits = None
 
     @debugbits
-    def frombitarray(self, bits, state, debug = False):
-        original_nbits = len(bits)
+    def frombitarray(self, reader, state, debug = False):
+        original_nbits = reader.remaining()
         
-        seqnr, bits = getnbits(14, bits)
-        self.seqnr = toint(seqnr)
+        self.seqnr = reader.readint(14)
 
-        while bits:
-            flag1, bits = getnbits(1, bits)
-            if flag1 == bitarray('0'):
+        endmarker = False
+        while reader.pos < reader.end:
+            if reader.readint(1) == 0:
                 part = PacketData()
                 self.parts.append(part)
-                bits = part.frombitarray(bits, state, debug = debug)
-            elif len(bits) >= 14:
+                part.frombitarray(reader, state, debug = debug)
+            elif reader.remaining() >= 14:
                 part = PacketAck()
                 self.parts.append(part)
-                bits = part.frombitarray(bits, debug = debug)
+                part.frombitarray(reader, debug = debug)
             else:
                 # the end
+                endmarker = True
                 break
 
-        parsed_nbits = len(self.tobitarray())
+        parsed_nbits = original_nbits - reader.remaining()
 
-        if len(bits) != original_nbits - parsed_nbits:
+        # Serializing the whole packet again only to count its bits is as much
+        # work as parsing it. The count can only be off for a packet without
+        # an end marker or with a payload that stopped on a parse error, so
+        # only check those (and everything when debugging)
+        payloaderror = any(part.channel_data.payload.bitsleftreason is not None
+                           for part in self.parts if isinstance(part, PacketData))
+        if ((debug or not endmarker or payloaderror) and
+            len(self.tobitarray()) != parsed_nbits):
             raise RuntimeError('Coding error: parsed bits + unparsed bits does not equal total bits: parsed so far: %s' % self.tostring(0))
 
         nr_of_padding_bits = 8 - (parsed_nbits % 8)
-        if len(bits) != nr_of_padding_bits:
+        if reader.remaining() != nr_of_padding_bits:
             raise ParseError('Left over bits at the end of the packet',
-                             bits)
+                             reader)
 
-        self.paddingbits, bits = getnbits(nr_of_padding_bits, bits)
-        return bits
+        self.paddingbits = reader.read(nr_of_padding_bits)
 
     def tobitarray(self):
         bits = int2bitarray(self.seqnr, 14)
@@ -1842,7 +2121,7 @@ class Parser():
         bitsleft = None
         errormsg = None
         try:
-            packet.frombitarray(bits, self.parser_state, debug = debug)
+            packet.frombitarray(BitReader(bits), self.parser_state, debug = debug)
         except ParseError as e:
             errormsg = str(e)
             bitsleft = e.bitsleft
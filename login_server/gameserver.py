@@ -30,6 +30,7 @@ import urllib.request
 from common.connectionhandler import Peer
 from common.datatypes import *
 from common.firewall import modify_firewall
+from common.geventwrapper import gevent_spawn
 from common.messages import Login2LauncherNextMapMessage, \
                             Login2LauncherSetPlayerLoadoutsMessage, \
                             Login2LauncherRemovePlayerLoadoutsMessage, \
@@ -41,6 +42,17 @@ from .player.state.unauthenticated_state import UnauthenticatedState
 from .player.state.authenticated_state import AuthenticatedState
 
 PING_UPDATE_TIME = 3
+GEO_LOOKUP_TIMEOUT = 3
+
+# Regions of game server IPs that have been looked up before. Game servers
+# reconnect with the same IP, so each IP only has to be looked up once.
+_region_cache = {}
+
+_continent_code_to_region = {
+    'NA': REGION_NORTH_AMERICA,
+    'EU': REGION_EUROPE,
+    'OC': REGION_OCEANIA_AUSTRALIA
+}
 
 
 @statetracer('server_id', 'detected_ip', 'address_pair', 'port', 'game_setting_mode', 'joinable',
@@ -73,22 +85,30 @@ class GameServer(Peer):
         self.ds_score = 0
         self.map_id = 0
 
-        if self.detected_ip.is_global:
-            response = urllib.request.urlopen('http://tools.keycdn.com/geo.json?host=%s' % self.detected_ip)
+        # Until the geo lookup has finished the server is assumed to be in Europe
+        self.region = _region_cache.get(self.detected_ip, REGION_EUROPE)
+        if self.detected_ip.is_global and self.detected_ip not in _region_cache:
+            gevent_spawn('geo lookup for %s' % self.detected_ip, self._lookup_region)
+
+    def _lookup_region(self):
+        try:
+            response = urllib.request.urlopen('http://tools.keycdn.com/geo.json?host=%s' % self.detected_ip,
+                                              timeout = GEO_LOOKUP_TIMEOUT)
             result = response.read()
             json_result = json.loads(result)
+        except (OSError, ValueError) as e:
+            # Don't remember the failure, so that the next connect tries again
+            self.logger.warning('server: geo lookup for %s failed: %s' % (self.detected_ip, e))
+            return
 
-            continent_code_to_region = {
-                'NA': REGION_NORTH_AMERICA,
-                'EU': REGION_EUROPE,
-                'OC': REGION_OCEANIA_AUSTRALIA
-            }
-            try:
-                self.region = continent_code_to_region[json_result['data']['geo']['continent_code']]
-            except KeyError:
-                self.region = REGION_EUROPE
-        else:
-            self.region = REGION_EUROPE
+        try:
+            continent_code = json_result['data']['geo']['continent_code']
+        except (KeyError, TypeError):
+            continent_code = None
+        region = _continent_code_to_region.get(continent_code, REGION_EUROPE)
+
+        _region_cache[self.detected_ip] = region
+        self.region = region
 
     def __str__(self):
         return 'GameServer(%d)' % self.server_id
@@ -166,10 +186,12 @@ class GameServer(Peer):
         self.send(msg)
 
     def send_all_players(self, data):
+        data = preserialized(data)
         for player in self.players.values():
             player.send(data)
 
     def send_all_players_on_team(self, data, team):
+        data = preserialized(data)
         for player in self.players.values():
             if player.team == team:
                 player.send(data)
@@ -241,16 +263,25 @@ class GameServer(Peer):
                 self._do_kick(vote_passed)
 
     def _tally_votes(self):
-        eligible_voters_votes = {
-            p.address_pair.get_address_seen_from(self.login_server.address_pair): p.vote
-            for p in self.players.values()
-        }
-        votes = {v for v in eligible_voters_votes.values() if v is not None}
-        yes_votes = [v for v in votes if v]
-
-        vote_passed = len(votes) >= 4 and len(yes_votes) / len(votes) >= 0.5
-
-        return len(eligible_voters_votes), len(votes), len(yes_votes), vote_passed
+        # Players behind the same IP only get one vote between them
+        login_address_pair = self.login_server.address_pair
+        voter_addresses = set()
+        total_votes = 0
+        yes_votes = 0
+        for p in self.players.values():
+            voter_address = p.address_pair.get_address_seen_from(login_address_pair)
+            if voter_address in voter_addresses:
+                continue
+            voter_addresses.add(voter_address)
+
+            if p.vote is not None:
+                total_votes += 1
+                if p.vote:
+                    yes_votes += 1
+
+        vote_passed = total_votes >= 4 and yes_votes / total_votes >= 0.5
+
+        return len(voter_addresses), total_votes, yes_votes, vote_passed
 
     def _do_kick(self, votekick_passed):
         player_to_kick = self.player_being_kicked
@@ -294,8 +325,7 @@ class GameServer(Peer):
         self.player_being_kicked = None
 
     def send_pings(self):
-        player_pings = {}
-        for unique_id, player in self.players.items():
-            player_pings[unique_id] = player.pings[self.region] if self.region in player.pings else 999
+        region = self.region
+        player_pings = {unique_id: player.pings.get(region, 999)
+                        for unique_id, player in self.players.items()}
         self.send(Login2LauncherPings(player_pings))
-        self.login_server.pending_callbacks.add(self, PING_UPDATE_TIME, self.send_pings)
@@ -33,7 +33,7 @@ from common.messages import *
 from common.statetracer import statetracer, TracingDict
 from common.versions import launcher2loginserver_protocol_version
 from .authcodehandler import AuthCodeRequester
-from .gameserver import GameServer
+from .gameserver import GameServer, PING_UPDATE_TIME
 from common.pendingcallbacks import PendingCallbacks, ExecuteCallbackMessage
 from .player.player import Player
 from .player.state.offline_state import OfflineState
@@ -88,6 +88,7 @@ class LoginServer:
         gevent.getcurrent().name = 'loginserver'
         self.logger.info('server: login server started')
         reset_firewall('blacklist')
+        self.pending_callbacks.add(self, PING_UPDATE_TIME, self.send_game_server_pings)
         while True:
             for message in self.server_queue:
                 handler = self.message_handlers[type(message)]
@@ -166,6 +167,14 @@ class LoginServer:
 
         return None
 
+    def send_game_server_pings(self):
+        # One timer for all game servers, rather than one for each of them
+        for game_server in self.game_servers.values():
+            # Servers start receiving pings once their address is known
+            if game_server.address_pair is not None:
+                game_server.send_pings()
+        self.pending_callbacks.add(self, PING_UPDATE_TIME, self.send_game_server_pings)
+
     def send_server_stats(self):
         stats = [
             {'locked':      gs.password_hash is not None,